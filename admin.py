@@ -0,0 +1,435 @@
+"""lunch-admin: order reports and maintenance for the lunch database.
+
+The database is found through DATA_DIR exactly as the app finds it.  Reports
+run one query each on a read-only connection and never migrate the schema,
+so they can be run against the live database without holding up the app.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import Counter, defaultdict, namedtuple
+from datetime import date, datetime
+
+from flask import Flask
+from sqlalchemy import delete, func, select
+
+from database import database_uri, get_data_dir, get_read_only_engine, setup_db
+from export import FORMATS as EXPORT_FORMATS, export_rows
+from menu import MenuCatalog
+from models import db, Order, User
+
+orders = Order.__table__
+users = User.__table__
+
+# A named block of rows; columns are (key, heading) pairs
+Section = namedtuple("Section", ["name", "title", "columns", "rows"])
+
+ORDER_COLUMNS = {
+    "id": "Order ID",
+    "date": "Date",
+    "user": "User",
+    "meal": "Meal",
+    "payment_intent_id": "Payment Intent",
+}
+
+
+# Commands that only read; they leave the database exactly as they find it
+READ_ONLY_COMMANDS = {"orders", "all-orders", "payment", "duplicates", "export"}
+
+
+def create_app(migrate=True):
+    """The admin app.  Without migrate, only locate the database: setup_db
+    would create and migrate the schema, which a report must not do."""
+    app = Flask(__name__)
+    if migrate:
+        app.config["DATA_DIR"] = setup_db(app)
+    else:
+        app.config["DATA_DIR"] = get_data_dir()
+        app.config["SQLALCHEMY_DATABASE_URI"] = database_uri(app.config["DATA_DIR"])
+    return app
+
+
+def load_menu(app):
+    path = os.path.join(app.config["DATA_DIR"], "data/lunch_options.json")
+    return MenuCatalog(path).get()
+
+
+def _order_rows(conn, *where, order_by):
+    stmt = (
+        select(
+            orders.c.id,
+            orders.c.date,
+            users.c.username.label("user"),
+            orders.c.meal_name.label("meal"),
+            orders.c.payment_intent_id,
+        )
+        .join_from(orders, users, orders.c.user_id == users.c.id)
+        .where(*where)
+        .order_by(*order_by)
+    )
+    return [row._asdict() for row in conn.execute(stmt)]
+
+
+def _columns(*keys):
+    return [(key, ORDER_COLUMNS[key]) for key in keys]
+
+
+def _meal_counts(rows, by_date=False):
+    counts = Counter(
+        (row["date"], row["meal"]) if by_date else row["meal"] for row in rows
+    )
+    if by_date:
+        return [
+            {"date": d, "meal": meal, "count": count}
+            for (d, meal), count in sorted(
+                counts.items(), key=lambda item: (item[0][0], -item[1], item[0][1])
+            )
+        ]
+    return [{"meal": meal, "count": count} for meal, count in counts.most_common()]
+
+
+def kitchen_sheet(conn, start, end, show_payment_intent=False):
+    """Everyone's meals for each day from start to end, with per-day counts"""
+    rows = _order_rows(
+        conn,
+        orders.c.date.between(start, end),
+        order_by=(orders.c.date, users.c.username),
+    )
+    keys = ["date", "user", "meal"]
+    if show_payment_intent:
+        keys.append("payment_intent_id")
+    title = f"Orders for {start}" if start == end else f"Orders for {start} to {end}"
+    return [
+        Section("orders", title, _columns(*keys), rows),
+        Section(
+            "summary",
+            "Summary",
+            [("date", "Date"), ("meal", "Meal"), ("count", "Count")],
+            _meal_counts(rows, by_date=True),
+        ),
+    ]
+
+
+def all_orders(conn, start=None, end=None):
+    where = [orders.c.date.between(start, end)] if start else []
+    rows = _order_rows(conn, *where, order_by=(orders.c.date.desc(), users.c.username))
+    return [
+        Section(
+            "orders",
+            "All orders",
+            _columns("id", "user", "date", "meal", "payment_intent_id"),
+            rows,
+        )
+    ]
+
+
+def payment_orders(conn, payment_intent_id):
+    """Orders paid by one payment intent, with meal counts and totals"""
+    rows = _order_rows(
+        conn,
+        orders.c.payment_intent_id == payment_intent_id,
+        order_by=(orders.c.date,),
+    )
+    totals = {
+        "orders": len(rows),
+        "users": len({row["user"] for row in rows}),
+    }
+    return [
+        Section(
+            "orders",
+            f"Orders for Payment Intent: {payment_intent_id}",
+            _columns("date", "user", "meal", "payment_intent_id"),
+            rows,
+        ),
+        Section(
+            "summary",
+            "Summary",
+            [("meal", "Meal"), ("count", "Count")],
+            _meal_counts(rows),
+        ),
+        Section(
+            "totals",
+            "Totals",
+            [("orders", "Total Orders"), ("users", "Unique Users")],
+            [totals],
+        ),
+    ]
+
+
+def duplicate_orders(conn):
+    """Orders that share a user, date and meal with another order"""
+    copies = (
+        func.count()
+        .over(partition_by=(orders.c.user_id, orders.c.date, orders.c.meal_name))
+        .label("copies")
+    )
+    counted = select(orders, copies).subquery()
+    stmt = (
+        select(
+            counted.c.id,
+            counted.c.date,
+            users.c.username.label("user"),
+            counted.c.meal_name.label("meal"),
+            counted.c.payment_intent_id,
+        )
+        .join_from(counted, users, counted.c.user_id == users.c.id)
+        .where(counted.c.copies > 1)
+        .order_by(users.c.username, counted.c.date, counted.c.id)
+    )
+    rows = [row._asdict() for row in conn.execute(stmt)]
+
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row["user"], row["date"], row["meal"])].append(str(row["id"]))
+    summary = [
+        {"user": user, "date": d, "meal": meal, "count": len(ids), "ids": ",".join(ids)}
+        for (user, d, meal), ids in groups.items()
+    ]
+    return [
+        Section(
+            "duplicates",
+            "Duplicate orders",
+            [
+                ("user", "User"),
+                ("date", "Date"),
+                ("meal", "Meal"),
+                ("count", "Count"),
+                ("ids", "Order IDs"),
+            ],
+            summary,
+        ),
+        Section(
+            "orders",
+            "Detailed view of duplicate orders",
+            _columns("user", "date", "meal", "id", "payment_intent_id"),
+            rows,
+        ),
+    ]
+
+
+def _extra_order_ids():
+    """Every order id except the earliest per (user_id, date)"""
+    keep = select(func.min(orders.c.id)).group_by(orders.c.user_id, orders.c.date)
+    return select(orders.c.id).where(orders.c.id.not_in(keep))
+
+
+def _cell(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return "" if value is None else str(value)
+
+
+def write_table(sections, out):
+    for section in sections:
+        headings = [heading for _, heading in section.columns]
+        cells = [
+            [_cell(row[key]) for key, _ in section.columns] for row in section.rows
+        ]
+        widths = [
+            max([len(heading)] + [len(line[i]) for line in cells])
+            for i, heading in enumerate(headings)
+        ]
+        out.write(f"{section.title}:\n")
+        out.write("-" * 40 + "\n")
+        if not cells:
+            out.write("(none)\n\n")
+            continue
+        for line in [headings, ["-" * w for w in widths]] + cells:
+            out.write("  ".join(v.ljust(w) for v, w in zip(line, widths)).rstrip())
+            out.write("\n")
+        out.write("\n")
+
+
+def write_csv(sections, out):
+    # CSV carries the detail rows; summaries are easy to rebuild from them
+    section = next(s for s in sections if s.name == "orders")
+    writer = csv.writer(out)
+    writer.writerow([key for key, _ in section.columns])
+    for row in section.rows:
+        writer.writerow([_cell(row[key]) for key, _ in section.columns])
+
+
+def write_json(sections, out):
+    data = {
+        section.name: [
+            {key: row[key] for key, _ in section.columns} for row in section.rows
+        ]
+        for section in sections
+    }
+    json.dump(data, out, indent=2, default=_cell)
+    out.write("\n")
+
+
+WRITERS = {"table": write_table, "csv": write_csv, "json": write_json}
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', use YYYY-MM-DD")
+
+
+def _confirm(prompt, assume_yes):
+    if assume_yes:
+        return True
+    return input(f"{prompt} (y/N) ").strip().lower() in ("y", "yes")
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--format", choices=sorted(WRITERS), default="table", help="output format"
+    )
+    date_range = argparse.ArgumentParser(add_help=False)
+    date_range.add_argument(
+        "--date-range",
+        nargs=2,
+        type=_date,
+        metavar=("START", "END"),
+        help="inclusive range of order dates",
+    )
+    confirm = argparse.ArgumentParser(add_help=False)
+    confirm.add_argument(
+        "-y", "--yes", action="store_true", help="do not ask for confirmation"
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="lunch-admin", description="Lunch order reports and maintenance"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sheet = commands.add_parser(
+        "orders", parents=[common, date_range], help="kitchen sheet for a day or range"
+    )
+    sheet.add_argument("date", nargs="?", type=_date, help="YYYY-MM-DD")
+    sheet.add_argument(
+        "-p",
+        "--payment-intent",
+        action="store_true",
+        help="include the payment intent of each order",
+    )
+
+    commands.add_parser(
+        "all-orders", parents=[common, date_range], help="list every order"
+    )
+
+    payment = commands.add_parser(
+        "payment", parents=[common], help="orders paid by one payment intent"
+    )
+    payment.add_argument("payment_intent_id")
+
+    commands.add_parser(
+        "duplicates", parents=[common], help="orders repeated for a user and date"
+    )
+
+    export = commands.add_parser(
+        "export",
+        parents=[date_range],
+        help="stream orders with usernames and menu prices",
+    )
+    export.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    export.add_argument("--restaurant", help="only orders for this restaurant")
+
+    commands.add_parser(
+        "dedup",
+        parents=[confirm],
+        help="delete all but the earliest order per user and date",
+    )
+
+    remove = commands.add_parser(
+        "remove", parents=[confirm], help="delete the orders of a payment intent"
+    )
+    remove.add_argument("payment_intent_id")
+
+    return parser
+
+
+def main(argv=None, out=None):
+    out = out or sys.stdout
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "orders":
+        if args.date_range:
+            start, end = args.date_range
+        elif args.date:
+            start = end = args.date
+        else:
+            parser.error("orders needs a date or --date-range")
+
+    app = create_app(migrate=args.command not in READ_ONLY_COMMANDS)
+    engine = get_read_only_engine(app)
+    try:
+        with engine.connect() as conn:
+            if args.command == "orders":
+                sections = kitchen_sheet(conn, start, end, args.payment_intent)
+            elif args.command == "all-orders":
+                sections = all_orders(conn, *(args.date_range or ()))
+            elif args.command in ("payment", "remove"):
+                sections = payment_orders(conn, args.payment_intent_id)
+            elif args.command == "duplicates":
+                sections = duplicate_orders(conn)
+            elif args.command == "export":
+                encode = EXPORT_FORMATS[args.format][0]
+                start, end = args.date_range or (None, None)
+                rows = export_rows(conn, load_menu(app), start, end, args.restaurant)
+                out.writelines(encode(rows))
+                return 0
+            elif args.command == "dedup":
+                extra = conn.execute(
+                    select(func.count()).select_from(_extra_order_ids().subquery())
+                ).scalar()
+    finally:
+        engine.dispose()
+
+    if args.command == "dedup":
+        return dedup(app, extra, args.yes, out)
+    if args.command == "remove":
+        return remove(app, sections, args.payment_intent_id, args.yes, out)
+    WRITERS[args.format](sections, out)
+    return 0
+
+
+def dedup(app, extra, assume_yes, out):
+    if not extra:
+        out.write("No duplicate orders found. Nothing to do.\n")
+        return 0
+    out.write(f"Found {extra} duplicate row(s) to remove.\n")
+    if not _confirm(
+        "Remove them, keeping the earliest order per user and date?", assume_yes
+    ):
+        out.write("Operation cancelled\n")
+        return 0
+    with app.app_context():
+        result = db.session.execute(
+            delete(orders).where(orders.c.id.in_(_extra_order_ids()))
+        )
+        db.session.commit()
+    out.write(f"Done. {result.rowcount} duplicate row(s) removed.\n")
+    return 0
+
+
+def remove(app, sections, payment_intent_id, assume_yes, out):
+    if not sections[0].rows:
+        out.write(f"No orders found for {payment_intent_id}\n")
+        return 1
+    out.write("The following orders will be deleted:\n")
+    write_table(sections[:1], out)
+    if not _confirm("Are you sure you want to delete these orders?", assume_yes):
+        out.write("Operation cancelled\n")
+        return 0
+    with app.app_context():
+        result = db.session.execute(
+            delete(orders).where(orders.c.payment_intent_id == payment_intent_id)
+        )
+        db.session.commit()
+    out.write(f"Deleted {result.rowcount} order(s).\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Request parsing and serialization for the read-only JSON API (/api/v1).
+
+The routes live in app.py.  Every list endpoint takes:
+
+    fields   comma-separated top-level fields to return (default: all)
+    limit    page size, 1 to MAX_LIMIT (default DEFAULT_LIMIT)
+    cursor   next_cursor from the previous page
+
+and answers {"data": [...], "next_cursor": "..." or null}.
+"""
+
+import bisect
+from collections import namedtuple
+from datetime import UTC, datetime
+
+from flask import g, request
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+MENU_FIELDS = ("date", "restaurant", "meals")
+DATE_FIELDS = ("date", "open", "cutoff")
+ORDER_FIELDS = ("date", "meal", "payment_intent_id")
+CONFIRMATION_FIELDS = ("payment_intent_id", "dates", "meals")
+
+# The parsed arguments of a list endpoint (see list_args)
+ListArgs = namedtuple("ListArgs", ["fields", "start", "end", "cursor", "limit"])
+
+
+class ApiError(Exception):
+    """A bad API request; answered as {"error": message} with this status"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def date_arg(name):
+    """The query argument ``name`` as a date, or None if it is absent"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ApiError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def limit_arg():
+    try:
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError("limit must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def fields_arg(allowed):
+    """The fields requested with ?fields=, in the order of ``allowed``"""
+    value = request.args.get("fields")
+    if not value:
+        return allowed
+    requested = set(value.split(","))
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ApiError(f"unknown field(s): {', '.join(sorted(unknown))}")
+    return tuple(field for field in allowed if field in requested)
+
+
+def list_args(allowed, parse_cursor=None):
+    """Parse and check every argument of a list endpoint, once per request.
+
+    The ETag functions call this too, so a bad request is answered 400
+    rather than 304, and the tag covers the parsed arguments.  ``cursor``
+    is a date unless parse_cursor is given to parse it instead.
+    """
+    if "api_args" not in g:
+        start, end = date_arg("start"), date_arg("end")
+        if start and end and start > end:
+            raise ApiError("start must not be after end")
+        if parse_cursor is None:
+            cursor = date_arg("cursor")
+        else:
+            cursor = parse_cursor(request.args.get("cursor"))
+        g.api_args = ListArgs(fields_arg(allowed), start, end, cursor, limit_arg())
+    return g.api_args
+
+
+def page(items, fields, next_cursor=None):
+    """The response body for one page of item dicts, trimmed to fields"""
+    return {
+        "data": [{field: item[field] for field in fields} for item in items],
+        "next_cursor": next_cursor,
+    }
+
+
+def dates_page(menu, start, end, limit, after):
+    """One page of the menu's dates in [start, end] after ``after``, sorted.
+
+    Returns (dates, next_cursor).  All bounds are dates or None.
+    """
+    start, end, after = (d and d.isoformat() for d in (start, end, after))
+    dates = menu.sorted_dates
+    lo = 0
+    if start is not None:
+        lo = bisect.bisect_left(dates, start)
+    if after is not None:
+        lo = max(lo, bisect.bisect_right(dates, after))
+    hi = len(dates) if end is None else bisect.bisect_right(dates, end)
+    selected = dates[lo : min(hi, lo + limit)]
+    next_cursor = selected[-1] if lo + limit < hi else None
+    return selected, next_cursor
+
+
+def menu_day(menu, date):
+    day = menu.options[date]
+    return {
+        "date": date,
+        "restaurant": day.get("restaurant"),
+        "meals": [
+            {
+                "name": meal["name"],
+                "type": meal.get("type"),
+                "description": meal.get("desc"),
+                "price_cents": menu.prices.price(date, meal["name"]),
+            }
+            for meal in day["meals"]
+        ],
+    }
+
+
+def date_state(menu, date, open_dates):
+    cutoff = datetime.fromtimestamp(menu.cutoffs.cutoff(date), UTC)
+    return {
+        "date": date,
+        "open": date in open_dates,
+        "cutoff": cutoff.isoformat().replace("+00:00", "Z"),
+    }
+
+
+def order_item(row):
+    return {
+        "date": row.date.isoformat(),
+        "meal": row.meal_name,
+        "payment_intent_id": row.payment_intent_id,
+    }
+
+
+def confirmation_item(confirmation):
+    return {
+        "payment_intent_id": confirmation.payment_intent_id,
+        "dates": confirmation.dates,
+        "meals": confirmation.meals,
+    }
@@ -9,6 +9,9 @@ from flask import (
     jsonify,
     send_from_directory,
     g,
+    abort,
+    Response,
+    stream_with_context,
 )
 from flask_login import (
     LoginManager,
@@ -17,19 +20,37 @@ from flask_login import (
     logout_user,
     current_user,
 )
-from flask_session import Session
-from cachelib import FileSystemCache
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
+import hmac
 import os
-import json
 import logging
-from config import get_timezone, get_cutoff_time, LOCATION
-import pytz
+from config import LOCATION
 import stripe
-from sqlalchemy.exc import IntegrityError
 from models import db, User, Order
 from database import setup_db
+from sessions import SqliteSessionInterface, SqliteSessionStore, skip_session
+from export import FORMATS as EXPORT_FORMATS, export_rows
+from identity import UserCache, watch_users
+from menu import MenuCatalog
+from fragments import FragmentCache, menu_key, render_menu_fragments
+import assets
+from conditional import etag, release_tag
+import api
+import metrics
+from passwords import DEFAULT_METHOD, HasherBusy, PasswordHasher
+from orders import (
+    confirmations_page,
+    orders_by_date,
+    orders_page,
+    orders_version,
+    parse_cursor,
+    save_orders,
+    save_paid_orders,
+)
+from payments import cart_snapshot, checkout_intent, get_payment
+from stripe_client import StripeAPI
+from webhooks import enqueue_event, notify_worker
+from pricing import format_cents
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -43,11 +64,12 @@ DATA_DIR = setup_db(app)
 # Store DATA_DIR in app config
 app.config["DATA_DIR"] = DATA_DIR
 
-# Create flask session directory if it doesn't exist
-session_dir = os.path.join(DATA_DIR, "flask_session")
-if not os.path.exists(session_dir):
-    os.makedirs(session_dir, mode=0o755)
-    logger.info(f"Created flask session directory at {session_dir}")
+# Request, database and Stripe metrics for /metrics
+with app.app_context():
+    metrics.init_app(app, db.engine)
+
+# Serve the hashed static files written by assets.py, if they were built
+assets.init_app(app)
 
 _secret_key = os.environ.get("SECRET_KEY")
 if not _secret_key:
@@ -60,19 +82,71 @@ if not _secret_key:
     )
     _secret_key = os.urandom(24).hex()
 app.config["SECRET_KEY"] = _secret_key
-app.config["SESSION_TYPE"] = "cachelib"
-app.config["SESSION_CACHELIB"] = FileSystemCache(session_dir)
+app.config["SESSION_SQLITE_PATH"] = os.path.join(DATA_DIR, "instance", "sessions.db")
 app.config["SESSION_PERMANENT"] = True
 app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(hours=1)
+# Unchanged sessions are re-saved to extend their expiry at most this often
+app.config["SESSION_REFRESH_INTERVAL"] = 300  # seconds
 app.config["SESSION_COOKIE_SECURE"] = True  # Changed to False for development
 app.config["SESSION_COOKIE_HTTPONLY"] = True
 app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
 
+# Password hashing runs in a small process pool per worker; see passwords.py.
+# Changing the method or cost upgrades each user's hash at their next login.
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get(
+    "PASSWORD_HASH_METHOD", DEFAULT_METHOD
+)
+app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", 1))
+app.config["PASSWORD_HASH_MAX_PENDING"] = int(
+    os.environ.get("PASSWORD_HASH_MAX_PENDING", 4)
+)
+app.config["PASSWORD_HASH_TIMEOUT"] = 10  # seconds
+
+# Logged-in users kept in each worker's identity cache, and for how long
+app.config["USER_CACHE_SIZE"] = 1024
+app.config["USER_CACHE_TTL"] = 60  # seconds
+
+# Usernames allowed to use the /admin endpoints, comma separated
+app.config["ADMIN_USERNAMES"] = {
+    name.strip()
+    for name in os.environ.get("ADMIN_USERNAMES", "").split(",")
+    if name.strip()
+}
+
+# Bearer token the Prometheus scraper sends to /metrics; unset disables /metrics
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN", "")
+
+# Add X-Query-Count/X-Query-Time-Ms to every response, for spotting N+1 queries
+app.config["QUERY_COUNT_HEADER"] = os.environ.get("QUERY_COUNT_HEADER") == "1"
+
+# Receipts shown per page on the dashboard
+app.config["CONFIRMATIONS_PER_PAGE"] = 20
+# Rendered menu fragments kept per worker (see fragments.py)
+app.config["MENU_FRAGMENT_CACHE_SIZE"] = 8
+
+# Parse the menu once per worker; it is re-read only when the file changes
+menu_catalog = MenuCatalog(os.path.join(DATA_DIR, "data/lunch_options.json"))
+
 # Configure Stripe
 stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
 stripe.api_version = "2026-03-25.dahlia"
 STRIPE_PUBLIC_KEY = os.environ.get("STRIPE_PUBLIC_KEY")
 STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET")
+# Point the Stripe client at another server, such as the load test stand-in
+if os.environ.get("STRIPE_API_BASE"):
+    stripe.api_base = os.environ["STRIPE_API_BASE"]
+# Retries per Stripe call (POSTs reuse one idempotency key across attempts),
+# and keep-alive connections to Stripe per gunicorn worker
+app.config["STRIPE_MAX_RETRIES"] = int(os.environ.get("STRIPE_MAX_RETRIES", 2))
+app.config["STRIPE_POOL_SIZE"] = int(os.environ.get("GUNICORN_THREADS", 2))
+# Seconds before checkout re-reads the status of a reused PaymentIntent
+app.config["CHECKOUT_INTENT_RECHECK"] = 300
+
+# Webhook inbox worker (see webhooks.py)
+app.config["WEBHOOK_WORKER_ENABLED"] = True
+app.config["WEBHOOK_BATCH_SIZE"] = 50
+app.config["WEBHOOK_POLL_INTERVAL"] = 5  # seconds
+app.config["WEBHOOK_MAX_ATTEMPTS"] = 5
 
 # Log Stripe key status (without exposing actual keys)
 app.logger.info(
@@ -83,12 +157,54 @@ app.logger.info(
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "login"
-Session(app)
+app.session_interface = SqliteSessionInterface(
+    app,
+    SqliteSessionStore(app.config["SESSION_SQLITE_PATH"]),
+    refresh_interval=app.config["SESSION_REFRESH_INTERVAL"],
+)
+
+
+password_hasher = PasswordHasher(
+    app.config["PASSWORD_HASH_METHOD"],
+    workers=app.config["PASSWORD_HASH_WORKERS"],
+    max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+    timeout=app.config["PASSWORD_HASH_TIMEOUT"],
+)
+
+
+@app.errorhandler(HasherBusy)
+def hasher_busy(e):
+    logger.warning(f"Rejecting {request.path}: {e}")
+    return (
+        "The server is busy, please try again in a moment.",
+        503,
+        {"Retry-After": "1"},
+    )
+
+
+stripe_api = StripeAPI(
+    max_retries=app.config["STRIPE_MAX_RETRIES"],
+    pool_size=app.config["STRIPE_POOL_SIZE"],
+)
+
+
+# Per-worker cache of the logged-in users, in front of the user_loader
+user_cache = UserCache(app.config["USER_CACHE_SIZE"], app.config["USER_CACHE_TTL"])
+watch_users(user_cache)
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.get(int(user_id))
+
+
+@app.after_request
+def query_count_header(response):
+    # g.db_queries and g.db_seconds are kept by metrics.py for every request
+    if app.config["QUERY_COUNT_HEADER"] and "db_queries" in g:
+        response.headers["X-Query-Count"] = str(g.db_queries)
+        response.headers["X-Query-Time-Ms"] = f"{g.db_seconds * 1000:.2f}"
+    return response
 
 
 # Add datetimeformat filter
@@ -101,10 +217,18 @@ def datetimeformat(value):
         return value
 
 
+# Format integer cents as dollars for display
+@app.template_filter("dollars")
+def dollars(cents):
+    return format_cents(cents)
+
+
 # Initialize session for new users
 @app.before_request
 def before_request():
     # Initialize session for new users and ensure cart is user-specific
+    # Only assign when something changes; the session store skips the write
+    # when the contents match what was loaded
     if current_user.is_authenticated:
         if "cart" not in session:
             session["cart"] = {}
@@ -112,61 +236,74 @@ def before_request():
         if "user_id" not in session or session["user_id"] != current_user.id:
             session["cart"] = {}
             session["user_id"] = current_user.id
-        session.permanent = True
-        session.modified = True
 
     # Make cart and lunch_options available to all templates
     g.cart = session.get("cart", {})
-    g.lunch_options = load_lunch_options()
+    if request.endpoint not in NO_MENU_ENDPOINTS:
+        g.menu = get_menu()
+        g.lunch_options = g.menu.options
 
 
 # Helper function to check if ordering is closed for a date
 def is_ordering_closed(date):
-    # Get current time in UTC
-    now_utc = datetime.utcnow().replace(tzinfo=pytz.UTC)
-
-    # Get the cutoff time in configured timezone and convert to UTC
-    tz = get_timezone()
-    cutoff_local = get_cutoff_time()
-    # Create a datetime with the input date and cutoff time in local timezone
-    cutoff_local_dt = tz.localize(datetime.combine(date, cutoff_local))
-    # Convert cutoff time to UTC
-    cutoff_utc = cutoff_local_dt.astimezone(pytz.UTC)
-
-    # Convert the input date to UTC for comparison
-    date_local = tz.localize(datetime.combine(date, datetime.min.time()))
-    date_utc = date_local.astimezone(pytz.UTC)
-
-    # Convert all to Unix timestamps
-    now_ts = now_utc.timestamp()
-    cutoff_ts = cutoff_utc.timestamp()
-    date_ts = date_utc.timestamp()
-
-    # Debug logging
-    app.logger.debug(f"Checking ordering status for date: {date}")
-    app.logger.debug(f"Current time (UTC): {now_utc}")
-    app.logger.debug(f"Cutoff time (UTC): {cutoff_utc}")
-    app.logger.debug(f"Date in UTC: {date_utc}")
-    app.logger.debug(
-        f"Unix timestamps - now: {now_ts}, cutoff: {cutoff_ts}, date: {date_ts}"
+    return get_menu().cutoffs.is_closed(date.strftime("%Y-%m-%d"))
+
+
+# Endpoints that never render the menu, so before_request skips loading it
+NO_MENU_ENDPOINTS = {"webhook", "serve_js", "static", "prometheus_metrics"}
+
+
+# Get the current menu snapshot (cached per worker)
+def get_menu():
+    return menu_catalog.get()
+
+
+# Changes when a deploy changes a template or static file (see conditional.py)
+RELEASE = release_tag(
+    os.path.join(app.root_path, app.template_folder), app.static_folder
+)
+
+
+def menu_page_tag():
+    """ETag inputs for the pages built from the menu, orders and cart.
+
+    orders_version is read from the database (one primary-key SELECT), not
+    the user cache, so orders written by the webhook worker, the admin CLI
+    or another gunicorn worker change the tag at once.
+    """
+    if "_flashes" in session:
+        return None
+    menu = g.menu
+    return (
+        RELEASE,
+        request.endpoint,
+        menu.version,
+        len(menu.cutoffs.open_dates()),
+        current_user.id,
+        current_user.username,
+        orders_version(current_user.id),
+        session.get("cart"),
     )
 
-    # If we're past the cutoff time for this date
-    if now_ts >= cutoff_ts:
-        app.logger.debug("Ordering is closed for this date")
-        return True
-    app.logger.debug("Ordering is open for this date")
-    return False
+
+# Menu markup rendered once per worker for each menu version and set of open
+# dates, then shared by every user's pages
+menu_fragment_cache = FragmentCache(app.config["MENU_FRAGMENT_CACHE_SIZE"])
+
+
+@app.template_global()
+def menu_fragments(menu=None, open_dates=None):
+    menu = menu or g.menu
+    if open_dates is None:
+        open_dates = menu.cutoffs.open_dates()
+    return menu_fragment_cache.get(
+        menu_key(menu, open_dates), lambda: render_menu_fragments(menu, open_dates)
+    )
 
 
 # Load lunch options from JSON file
 def load_lunch_options():
-    options_path = os.path.join(
-        app.config.get("DATA_DIR", "."), "data/lunch_options.json"
-    )
-    with open(options_path, "r") as f:
-        data = json.load(f)
-        return data["daily_options"]
+    return get_menu().options
 
 
 @app.route("/")
@@ -188,7 +325,10 @@ def login():
 
         user = User.query.filter_by(username=username).first()
         if user:
-            if check_password_hash(user.password_hash, password):
+            if password_hasher.verify(user.password_hash, password):
+                if password_hasher.needs_rehash(user.password_hash):
+                    _upgrade_password_hash(user, password)
+
                 # Clear any session data that may have belonged to a previous
                 # user before establishing the new session. Without this, a
                 # cart or pending_payment_intent left behind by another account
@@ -198,6 +338,7 @@ def login():
                 session.pop("cart", None)
                 session.pop("user_id", None)
                 session.pop("pending_payment_intent", None)
+                session.pop("checkout_intent", None)
 
                 login_user(user)
 
@@ -216,6 +357,16 @@ def login():
     return render_template("login.html", location=LOCATION)
 
 
+def _upgrade_password_hash(user, password):
+    """Re-hash with the configured method; skipped if the pool is busy"""
+    try:
+        user.password_hash = password_hasher.hash(password)
+    except HasherBusy:
+        return
+    db.session.commit()
+    logger.info(f"Upgraded password hash for user {user.id}")
+
+
 @app.route("/register", methods=["GET", "POST"])
 def register():
     if request.method == "POST":
@@ -226,7 +377,7 @@ def register():
             flash("Username already exists")
             return redirect(url_for("register"))
 
-        user = User(username=username, password_hash=generate_password_hash(password))
+        user = User(username=username, password_hash=password_hasher.hash(password))
         db.session.add(user)
         db.session.commit()
 
@@ -236,65 +387,42 @@ def register():
 
 @app.route("/dashboard")
 @login_required
+@etag(menu_page_tag)
 def dashboard():
     if "user_id" not in session:
         return redirect(url_for("login"))
 
     user_id = session["user_id"]
-    user = User.query.get(user_id)
 
     # Initialize lunch options
-    lunch_options = load_lunch_options()
+    menu = get_menu()
+    lunch_options = menu.options
 
     # Get dates from lunch options
-    week_dates = list(lunch_options.keys())
+    week_dates = menu.dates
 
     # Check which dates have closed ordering
-    ordering_closed = {
-        date: is_ordering_closed(datetime.strptime(date, "%Y-%m-%d").date())
-        for date in week_dates
-    }
-
-    # Fetch past confirmations for the user
-    all_orders = (
-        Order.query.filter_by(user_id=user_id).order_by(Order.date.desc()).all()
+    open_dates = menu.cutoffs.open_dates()
+    ordering_closed = {date: date not in open_dates for date in week_dates}
+
+    # One page of past confirmations, grouped and ordered in SQL
+    confirmations, next_cursor = confirmations_page(
+        user_id,
+        app.config["CONFIRMATIONS_PER_PAGE"],
+        parse_cursor(request.args.get("before")),
     )
 
-    # Group orders by payment_intent_id
-    confirmations = {}
-    for order in all_orders:
-        if order.payment_intent_id:
-            if order.payment_intent_id not in confirmations:
-                confirmations[order.payment_intent_id] = {
-                    "dates": [],
-                    "meals": [],
-                    "first_date": order.date,  # Keep track of the first date for sorting
-                }
-            confirmations[order.payment_intent_id]["dates"].append(
-                order.date.strftime("%Y-%m-%d")
-            )
-            confirmations[order.payment_intent_id]["meals"].append(order.meal_name)
-
-    # Convert to list and sort by first date
-    confirmations_list = [
-        {"payment_intent_id": pid, "dates": data["dates"], "meals": data["meals"]}
-        for pid, data in confirmations.items()
-    ]
-    confirmations_list.sort(
-        key=lambda x: max([datetime.strptime(d, "%Y-%m-%d") for d in x["dates"]]),
-        reverse=True,
-    )
-
-    # Create orders dictionary for the current week view
-    orders = {order.date.strftime("%Y-%m-%d"): order.meal_name for order in all_orders}
+    # Orders for the dates on the current menu
+    orders = orders_by_date(user_id, week_dates)
 
     # Get cart from session
     cart = session.get("cart", {})
 
     return render_template(
         "dashboard.html",
-        user=user,
-        confirmations=confirmations_list,
+        confirmations=confirmations,
+        next_cursor=next_cursor,
+        fragments=menu_fragments(menu, open_dates),
         lunch_options=lunch_options,
         location=LOCATION,
         week_dates=week_dates,
@@ -310,13 +438,14 @@ def order():
     logger.debug(f"Received order request: {request.form}")
 
     # Load lunch options to get meal names
-    lunch_options = load_lunch_options()
+    menu = get_menu()
 
     # Get list of dates that already have orders
     ordered_dates = request.form.getlist("ordered_dates")
     logger.debug(f"Ordered dates: {ordered_dates}")
 
-    # Process all orders in the form
+    # Collect the valid selections in the form
+    selections = {}
     for key, meal_name in request.form.items():
         if key.startswith("meal_"):
             date_str = key.replace("meal_", "")
@@ -326,55 +455,19 @@ def order():
                 logger.debug(f"Skipping already ordered date: {date_str}")
                 continue
 
-            date = datetime.strptime(date_str, "%Y-%m-%d").date()
-
             # Verify the meal exists in the options
-            if date_str in lunch_options:
-                meal_exists = any(
-                    meal["name"] == meal_name
-                    for meal in lunch_options[date_str]["meals"]
-                )
-                if not meal_exists:
+            if date_str in menu.options:
+                if not menu.has_meal(date_str, meal_name):
                     logger.error(
                         f"Invalid meal selection: {meal_name} for date {date_str}"
                     )
                     continue
 
-            logger.debug(f"Processing order for date: {date}, meal_name: {meal_name}")
-
-            # Check if order already exists for this date
-            existing_order = Order.query.filter_by(
-                user_id=current_user.id, date=date
-            ).first()
-
-            if existing_order:
-                logger.debug(f"Updating existing order: {existing_order}")
-                existing_order.meal_name = meal_name
-            else:
-                logger.debug("Creating new order")
-                new_order = Order(
-                    user_id=current_user.id, date=date, meal_name=meal_name
-                )
-                db.session.add(new_order)
+            selections[date_str] = meal_name
 
     try:
-        db.session.commit()
-        flash("Orders saved successfully!")
-    except IntegrityError:
-        # A concurrent request inserted the same (user_id, date) between our
-        # SELECT and INSERT.  Roll back and update the existing row instead.
-        db.session.rollback()
-        for key, meal_name in request.form.items():
-            if key.startswith("meal_"):
-                date_str = key.replace("meal_", "")
-                if date_str in ordered_dates:
-                    continue
-                date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                existing = Order.query.filter_by(
-                    user_id=current_user.id, date=date
-                ).first()
-                if existing:
-                    existing.meal_name = meal_name
+        # Insert or update every date in one transaction
+        save_orders(current_user.id, selections)
         db.session.commit()
         flash("Orders saved successfully!")
     except Exception as e:
@@ -403,7 +496,7 @@ def add_to_cart():
         logger.debug(f"Form data received: {request.form}")
 
         # Load lunch options to get meal names
-        lunch_options = load_lunch_options()
+        menu = get_menu()
 
         # Get the cart from session or initialize it
         cart = session.get("cart", {})
@@ -433,18 +526,13 @@ def add_to_cart():
                     continue
 
                 # Check if ordering is closed for this date
-                date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                if is_ordering_closed(date):
+                if menu.cutoffs.is_closed(date_str):
                     removed_items.append(date_str)
                     continue
 
                 # Verify the meal exists in the options
-                if date_str in lunch_options:
-                    meal_exists = any(
-                        meal["name"] == meal_name
-                        for meal in lunch_options[date_str]["meals"]
-                    )
-                    if meal_exists:
+                if date_str in menu.options:
+                    if menu.has_meal(date_str, meal_name):
                         # Add valid meal selection to cart
                         cart[date_str] = meal_name
                         logger.debug(
@@ -486,22 +574,9 @@ def add_to_cart():
 def submit_cart():
     cart = session.get("cart", {})
 
-    # Process all orders in the cart
-    for date_str, meal_name in cart.items():
-        date = datetime.strptime(date_str, "%Y-%m-%d").date()
-
-        # Check if order already exists for this date
-        existing_order = Order.query.filter_by(
-            user_id=current_user.id, date=date
-        ).first()
-
-        if existing_order:
-            existing_order.meal_name = meal_name
-        else:
-            new_order = Order(user_id=current_user.id, date=date, meal_name=meal_name)
-            db.session.add(new_order)
-
     try:
+        # Process all orders in the cart
+        save_orders(current_user.id, cart)
         db.session.commit()
         # Clear the cart after successful submission
         session.pop("cart", None)
@@ -571,25 +646,15 @@ def delete_order():
 
 @app.route("/cart")
 @login_required
+@etag(menu_page_tag)
 def cart():
-    lunch_options = load_lunch_options()
     cart = session.get("cart", {})
-    total = sum(
-        next(
-            (
-                m["price"]
-                for m in lunch_options[date]["meals"]
-                if m["name"] == meal_name
-            ),
-            0,
-        )
-        for date, meal_name in cart.items()
-    )
+    pricing = get_menu().prices.price_cart(cart)
     return render_template(
         "cart.html",
         cart=cart,
-        lunch_options=lunch_options,
-        total=total,
+        prices=pricing.prices,
+        total=pricing.total_cents,
         location=LOCATION,
     )
 
@@ -611,39 +676,30 @@ def checkout():
         flash("Your cart is empty", "warning")
         return redirect(url_for("cart"))
 
-    # Load lunch options and calculate total
-    lunch_options = load_lunch_options()
-    total = sum(
-        next(
-            (
-                m["price"]
-                for m in lunch_options[date]["meals"]
-                if m["name"] == meal_name
-            ),
-            0,
-        )
-        for date, meal_name in cart.items()
-    )
+    # Price the cart in cents
+    pricing = get_menu().prices.price_cart(cart)
 
     try:
-        # Create a PaymentIntent
-        intent = stripe.PaymentIntent.create(
-            amount=int(total * 100),  # amount in cents
-            currency="usd",
-            automatic_payment_methods={"enabled": True},
-            metadata={
-                "cart": json.dumps(cart),
-                "user_id": str(current_user.id),
-            },
+        # Reuse this cart's PaymentIntent across page loads; a new or updated
+        # one is recorded locally so confirmation pages can skip the Stripe API
+        intent = checkout_intent(
+            stripe_api,
+            current_user.id,
+            cart,
+            pricing.total_cents,
+            saved=session.get("checkout_intent"),
+            recheck_after=app.config["CHECKOUT_INTENT_RECHECK"],
         )
+        db.session.commit()
+        session["checkout_intent"] = intent
 
         return render_template(
             "checkout.html",
             cart=cart,
-            lunch_options=lunch_options,
-            total=total,
+            prices=pricing.prices,
+            total=pricing.total_cents,
             stripe_public_key=STRIPE_PUBLIC_KEY,
-            client_secret=intent.client_secret,
+            client_secret=intent["client_secret"],
             location=LOCATION,
         )
 
@@ -675,19 +731,18 @@ def confirmation():
             flash("Payment was not completed successfully. Please try again.", "warning")
             return redirect(url_for("cart"))
 
-        # Retrieve the payment intent from Stripe
-        app.logger.info(f"Retrieving payment intent {payment_intent_id} from Stripe")
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-        app.logger.info(f"Payment intent status: {intent.status}")
+        # Look up the payment locally, falling back to Stripe if not final
+        payment = get_payment(payment_intent_id, stripe_api)
+        app.logger.info(f"Payment intent status: {payment.status}")
 
-        if intent.status != "succeeded":
-            app.logger.warning(f"Payment not completed. Status: {intent.status}")
+        if payment.status != "succeeded":
+            app.logger.warning(f"Payment not completed. Status: {payment.status}")
             flash("Payment not completed", "warning")
             return redirect(url_for("cart"))
 
-        # Retrieve cart from payment intent metadata
-        app.logger.info("Retrieving cart from payment intent metadata")
-        cart = json.loads(intent.metadata["cart"] if "cart" in intent.metadata else "{}")
+        # Retrieve cart from the payment's cart snapshot
+        app.logger.info("Retrieving cart from payment record")
+        cart = cart_snapshot(payment)
         app.logger.debug(f"Cart from metadata: {cart}")
 
         if not cart:
@@ -703,54 +758,28 @@ def confirmation():
             session["pending_payment_intent"] = payment_intent_id
             return redirect(url_for("login", next=url_for("confirmation")))
 
-        # Load lunch options
-        lunch_options = load_lunch_options()
-
         app.logger.info("Saving orders to database")
-        # Guard against double-saves (page reload, browser back+forward, etc.)
-        already_saved = Order.query.filter_by(
-            user_id=current_user.id,
-            payment_intent_id=payment_intent_id,
-        ).first()
-
-        if not already_saved:
-            for date, meal_name in cart.items():
-                app.logger.debug(f"Processing order for date: {date}, meal: {meal_name}")
-                date_obj = datetime.strptime(date, "%Y-%m-%d").date()
-                order = Order(
-                    user_id=current_user.id,
-                    date=date_obj,
-                    meal_name=meal_name,
-                    payment_intent_id=payment_intent_id,
-                )
-                db.session.add(order)
-
-            db.session.commit()
-            app.logger.info("Orders saved successfully")
-        else:
-            app.logger.info("Orders already saved for this payment intent, skipping insert")
+        # One statement; dates already saved, by a reload or the webhook,
+        # are skipped
+        inserted = save_paid_orders(current_user.id, cart, payment_intent_id)
+        db.session.commit()
+        app.logger.info(f"Saved {len(inserted)} of {len(cart)} order(s)")
 
         # Calculate prices for confirmation page
-        prices = {
-            date: next(
-                (
-                    m["price"]
-                    for m in lunch_options[date]["meals"]
-                    if m["name"] == meal_name
-                ),
-                0,
-            )
-            for date, meal_name in cart.items()
-        }
-        total = sum(prices.values())
+        pricing = get_menu().prices.price_cart(cart)
 
         # Store order details for display
-        order_details = {"cart": cart, "prices": prices, "total": total}
+        order_details = {
+            "cart": cart,
+            "prices": pricing.prices,
+            "total": pricing.total_cents,
+        }
 
         # Clear cart from session and g.cart
         session["cart"] = {}
         g.cart = {}
         session.pop("pending_payment_intent", None)
+        session.pop("checkout_intent", None)
         session.modified = True
         app.logger.info("Cart cleared from session")
 
@@ -783,6 +812,7 @@ def confirmation():
 
 
 @app.route("/js/<path:filename>")
+@skip_session
 def serve_js(filename):
     return send_from_directory("static/js", filename)
 
@@ -805,37 +835,29 @@ def print_confirmation(payment_intent_id):
             flash("Order not found", "error")
             return redirect(url_for("dashboard"))
 
-        # Get payment details from Stripe
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        # Get payment details from the local ledger (or Stripe if not final)
+        payment = get_payment(payment_intent_id, stripe_api)
 
         # Load lunch options for meal details
-        lunch_options = load_lunch_options()
+        menu = get_menu()
 
         # Format order details
         order_details = []
         for order in orders:
             date_str = order.date.strftime("%Y-%m-%d")
-            if date_str in lunch_options:
-                meal_price = next(
-                    (
-                        m["price"]
-                        for m in lunch_options[date_str]["meals"]
-                        if m["name"] == order.meal_name
-                    ),
-                    0,
-                )
+            if date_str in menu.options:
                 order_details.append(
                     {
                         "date": order.date,
                         "meal_name": order.meal_name,
-                        "price": meal_price,
+                        "price": menu.prices.price(date_str, order.meal_name),
                     }
                 )
 
         return render_template(
             "print_confirmation.html",
             orders=order_details,
-            total=intent.amount / 100,  # Convert cents to dollars
+            total=payment.amount,
             payment_id=payment_intent_id,
             date=orders[0].date,
             location=LOCATION,
@@ -848,6 +870,7 @@ def print_confirmation(payment_intent_id):
 
 
 @app.route("/webhook", methods=["POST"])
+@skip_session
 def webhook():
     payload = request.get_data()
     sig_header = request.headers.get("Stripe-Signature")
@@ -863,53 +886,147 @@ def webhook():
         app.logger.error(f"Webhook error: {e}")
         return "", 400
 
-    if event["type"] == "payment_intent.succeeded":
-        intent = event["data"]["object"]
-        payment_intent_id = intent["id"]
-        metadata = intent["metadata"] if "metadata" in intent else {}
-        user_id = metadata["user_id"] if "user_id" in metadata else None
-        cart_json = metadata["cart"] if "cart" in metadata else "{}"
+    # Acknowledge quickly: store the event and let the inbox worker apply it
+    event_id = event["id"] if "id" in event else None
+    if enqueue_event(event_id, event["type"], payload.decode("utf-8")):
+        notify_worker(app)
 
-        if not user_id or not cart_json:
-            app.logger.warning(f"Webhook: missing metadata on {payment_intent_id}")
-            return "", 200
+    return "", 200
 
-        try:
-            user_id_int = int(user_id)
-        except (ValueError, TypeError):
-            app.logger.error(f"Webhook: invalid user_id '{user_id}' on {payment_intent_id}")
-            return "", 200
 
-        try:
-            cart = json.loads(cart_json)
-        except (ValueError, json.JSONDecodeError):
-            app.logger.error(f"Webhook: invalid cart JSON on {payment_intent_id}")
-            return "", 200
-
-        already_saved = Order.query.filter_by(
-            payment_intent_id=payment_intent_id
-        ).first()
-
-        if not already_saved:
-            for date, meal_name in cart.items():
-                date_obj = datetime.strptime(date, "%Y-%m-%d").date()
-                order = Order(
-                    user_id=user_id_int,
-                    date=date_obj,
-                    meal_name=meal_name,
-                    payment_intent_id=payment_intent_id,
-                )
-                db.session.add(order)
-            db.session.commit()
-            app.logger.info(
-                f"Webhook: saved {len(cart)} order(s) for payment {payment_intent_id}"
-            )
-        else:
-            app.logger.info(
-                f"Webhook: orders already saved for {payment_intent_id}, skipping"
-            )
+@app.route("/admin/export")
+@login_required
+def export_orders():
+    if current_user.username not in app.config["ADMIN_USERNAMES"]:
+        abort(403)
 
-    return "", 200
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    try:
+        start, end = (
+            datetime.strptime(value, "%Y-%m-%d").date() if value else None
+            for value in (request.args.get("start"), request.args.get("end"))
+        )
+    except ValueError:
+        abort(400)
+    encode, mimetype = EXPORT_FORMATS[fmt]
+
+    # Rows are read and sent as the cursor advances, never held in memory
+    rows = export_rows(
+        db.session, get_menu(), start, end, request.args.get("restaurant")
+    )
+    return Response(
+        stream_with_context(encode(rows)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=orders.{fmt}"},
+    )
+
+
+# Read-only JSON API; request parsing and serialization are in api.py
+
+
+@app.errorhandler(api.ApiError)
+def api_error(e):
+    return jsonify({"error": str(e)}), e.status
+
+
+# Fields and cursor parser of each list endpoint, for api.list_args()
+API_LIST_ARGS = {
+    "api_menu": (api.MENU_FIELDS, None),
+    "api_dates": (api.DATE_FIELDS, None),
+    "api_orders": (api.ORDER_FIELDS, None),
+    "api_confirmations": (api.CONFIRMATION_FIELDS, parse_cursor),
+}
+
+
+def _api_args():
+    return api.list_args(*API_LIST_ARGS[request.endpoint])
+
+
+def api_menu_tag():
+    return ("api", request.endpoint, _api_args(), g.menu.version)
+
+
+def api_dates_tag():
+    open_dates = len(g.menu.cutoffs.open_dates())
+    return ("api", request.endpoint, _api_args(), g.menu.version, open_dates)
+
+
+def api_user_tag():
+    if not current_user.is_authenticated:
+        return None
+    user_id = current_user.id
+    return ("api", request.endpoint, _api_args(), user_id, orders_version(user_id))
+
+
+def _api_user():
+    if not current_user.is_authenticated:
+        raise api.ApiError("login required", 401)
+    return current_user
+
+
+# Menu and open dates are the same for everyone, so they skip the session
+# (and its cookie) and may be cached by a reverse proxy for a minute
+@app.route("/api/v1/menu")
+@skip_session
+@etag(api_menu_tag, public_max_age=60)
+def api_menu():
+    args = _api_args()
+    dates, next_cursor = api.dates_page(
+        g.menu, args.start, args.end, args.limit, args.cursor
+    )
+    days = [api.menu_day(g.menu, date) for date in dates]
+    return jsonify(api.page(days, args.fields, next_cursor))
+
+
+@app.route("/api/v1/dates")
+@skip_session
+@etag(api_dates_tag, public_max_age=60)
+def api_dates():
+    args = _api_args()
+    dates, next_cursor = api.dates_page(
+        g.menu, args.start, args.end, args.limit, args.cursor
+    )
+    open_dates = g.menu.cutoffs.open_dates()
+    states = [api.date_state(g.menu, date, open_dates) for date in dates]
+    return jsonify(api.page(states, args.fields, next_cursor))
+
+
+@app.route("/api/v1/me/orders")
+@etag(api_user_tag)
+def api_orders():
+    user = _api_user()
+    args = _api_args()
+    rows, next_cursor = orders_page(
+        user.id, args.limit, args.start, args.end, args.cursor
+    )
+    return jsonify(api.page(map(api.order_item, rows), args.fields, next_cursor))
+
+
+@app.route("/api/v1/me/confirmations")
+@etag(api_user_tag)
+def api_confirmations():
+    user = _api_user()
+    args = _api_args()
+    confirmations, next_cursor = confirmations_page(user.id, args.limit, args.cursor)
+    items = map(api.confirmation_item, confirmations)
+    return jsonify(api.page(items, args.fields, next_cursor))
+
+
+@app.route("/metrics")
+@skip_session
+def prometheus_metrics():
+    # Traffic and error counts are not for the public ingress
+    token = app.config["METRICS_TOKEN"]
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()
+    ):
+        return "", 401, {"WWW-Authenticate": "Bearer"}
+    body, content_type = metrics.metrics_response()
+    return Response(body, content_type=content_type)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+"""Content-hashed, precompressed copies of the static files.
+
+``python assets.py`` (run when the image is built) copies every file under
+static/ to static/dist/ with a hash of its content in the name, writes gzip
+and brotli variants of the text files, and records the names in
+static/dist/manifest.json.
+
+init_app() makes url_for("static", filename=...) point at the hashed copy
+and serves those copies with the best encoding the browser accepts and a
+year-long immutable Cache-Control, since a changed file gets a new name.
+Without a manifest, as in development and tests, static files are served
+as before.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import sys
+
+from flask import request, send_from_directory
+
+logger = logging.getLogger(__name__)
+
+DIST = "dist"
+MANIFEST = "manifest.json"
+# Types worth compressing; images such as PNG are compressed already
+COMPRESSIBLE = {".js", ".css", ".svg", ".ico", ".json", ".txt"}
+# Encodings in order of preference, with the suffix of their precompressed file
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def hashed_name(path, content):
+    """``js/cart.js`` -> ``js/cart.<hash>.js``"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def build(static_dir, dist_dir=None):
+    """Write hashed and compressed copies of static_dir; returns the manifest"""
+    # Only needed at build time, so the app itself does not import it
+    import brotli
+
+    dist_dir = dist_dir or os.path.join(static_dir, DIST)
+    # Start empty so the walk below skips old output and stale hashes go away
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.relpath(os.path.join(root, name), static_dir)
+            logical = path.replace(os.sep, "/")
+            with open(os.path.join(root, name), "rb") as f:
+                content = f.read()
+            target = hashed_name(logical, content)
+            _write(dist_dir, target, content)
+            if os.path.splitext(name)[1] in COMPRESSIBLE:
+                _write(dist_dir, target + ".gz", gzip.compress(content, mtime=0))
+                _write(dist_dir, target + ".br", brotli.compress(content))
+            manifest[logical] = target
+    _write(dist_dir, MANIFEST, json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+
+def _write(dist_dir, name, content):
+    path = os.path.join(dist_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def load_manifest(dist_dir):
+    try:
+        with open(os.path.join(dist_dir, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def init_app(app, dist_dir=None):
+    """Serve static files through the manifest in dist_dir, if there is one"""
+    dist_dir = dist_dir or os.path.join(app.static_folder, DIST)
+    manifest = load_manifest(dist_dir)
+    if not manifest:
+        logger.info(f"No asset manifest in {dist_dir}; serving static files as-is")
+        return
+    logger.info(f"Serving {len(manifest)} hashed static files from {dist_dir}")
+    default_view = app.view_functions["static"]
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = f"{DIST}/{manifest[values['filename']]}"
+
+    def static(filename):
+        if not filename.startswith(f"{DIST}/"):
+            return default_view(filename=filename)
+        name = filename[len(DIST) + 1 :]
+        encoding, suffix = _encoding(dist_dir, name)
+        response = send_from_directory(
+            dist_dir, name + suffix, mimetype=_mimetype(name), conditional=True
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions["static"] = static
+
+
+def _encoding(dist_dir, name):
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+        if accepted[encoding] and os.path.isfile(os.path.join(dist_dir, name + suffix)):
+            return encoding, suffix
+    return None, ""
+
+
+def _mimetype(name):
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+if __name__ == "__main__":
+    static_dir = sys.argv[1] if len(sys.argv) > 1 else "static"
+    manifest = build(static_dir)
+    print(f"Wrote {len(manifest)} hashed assets to {os.path.join(static_dir, DIST)}")
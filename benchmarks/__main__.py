@@ -0,0 +1,83 @@
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+DEFAULT_SIZES = [10, 100, 1000, 10_000, 100_000]
+
+
+def run_command(args):
+    # The app sets up its database on import, so give it a scratch DATA_DIR
+    os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="lunch-bench-")
+    from benchmarks.cases import CASES
+    from benchmarks.runner import run_cases, save
+
+    # app configures DEBUG logging, which would swamp the results
+    logging.getLogger().setLevel(logging.WARNING)
+    unknown = set(args.case or ()) - CASES.keys()
+    if unknown:
+        print(f"Unknown case(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    results = run_cases(CASES, args.sizes, args.repeat, selected=args.case, log=print)
+    save(results, args.output)
+    print(f"Saved {len(results)} result(s) to {args.output}")
+    return 0
+
+
+def compare_command(args):
+    from benchmarks.runner import compare, load
+
+    rows = compare(load(args.baseline), load(args.current), args.threshold)
+    regressions = 0
+    for key, before, after, ratio, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        regressions += regressed
+        print(
+            f"{key:<40} {before * 1e3:10.3f} ms {after * 1e3:10.3f} ms {ratio:6.2f}x {flag}"
+        )
+    print(
+        f"{regressions} regression(s) over {args.threshold:.0%} "
+        f"in {len(rows)} comparable result(s)"
+    )
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Microbenchmarks for hot paths"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and save the results")
+    run.add_argument(
+        "--output", default="benchmarks/results.json", help="results file to write"
+    )
+    run.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="synthetic data sizes (menu days or order rows)",
+    )
+    run.add_argument("--repeat", type=int, default=5, help="measurements per case")
+    run.add_argument("--case", action="append", help="only run this case (repeatable)")
+    run.set_defaults(func=run_command)
+
+    comp = commands.add_parser("compare", help="flag regressions against a baseline")
+    comp.add_argument("baseline")
+    comp.add_argument("current")
+    comp.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slowdown ratio that counts as a regression (0.1 = 10%%)",
+    )
+    comp.set_defaults(func=compare_command)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Benchmark cases for the request hot paths.
+
+Each case's setup(size) builds synthetic data of that size and returns the
+zero-argument function to time.  DATA_DIR must point at a scratch directory
+before this module is imported, since importing app sets up its database.
+"""
+
+import json
+import os
+import tempfile
+from collections import namedtuple
+from datetime import date, timedelta
+
+from flask import g, render_template
+from sqlalchemy import delete, insert
+
+import app as app_module
+from app import app
+from menu import Menu, MenuCatalog
+from models import db, Order, User
+from orders import confirmations_page, orders_by_date
+
+Case = namedtuple("Case", ["setup", "max_size"])
+
+CASES = {}
+
+# Far enough ahead that every synthetic date is still open for ordering
+FIRST_DATE = date(2030, 1, 7)
+
+
+def case(name, max_size=100_000):
+    def register(setup):
+        CASES[name] = Case(setup, max_size)
+        return setup
+
+    return register
+
+
+def synthetic_options(days, meals_per_day=4):
+    options = {}
+    for i in range(days):
+        day = (FIRST_DATE + timedelta(days=i)).isoformat()
+        options[day] = {
+            "restaurant": f"Restaurant {i % 7}",
+            "meals": [
+                {
+                    "name": f"Meal {j}",
+                    "type": "CVGN"[j % 4],
+                    "desc": "A synthetic meal with a description of typical length",
+                    "price": 18.5 + j,
+                }
+                for j in range(meals_per_day)
+            ],
+        }
+    return options
+
+
+def _menu_file(days):
+    path = os.path.join(tempfile.mkdtemp(prefix="lunch-bench-"), "lunch_options.json")
+    with open(path, "w") as f:
+        json.dump({"daily_options": synthetic_options(days)}, f)
+    return path
+
+
+def _use_menu(days):
+    """Point the app at a synthetic menu file; returns the loaded Menu"""
+    app_module.menu_catalog = MenuCatalog(_menu_file(days))
+    return app_module.get_menu()
+
+
+@case("menu_parse")
+def menu_parse(size):
+    catalog = MenuCatalog(_menu_file(size))
+    return catalog._load
+
+
+@case("load_lunch_options")
+def load_lunch_options(size):
+    _use_menu(size)
+    return app_module.load_lunch_options
+
+
+@case("is_ordering_closed")
+def is_ordering_closed(size):
+    menu = _use_menu(size)
+    dates = [date.fromisoformat(d) for d in menu.dates]
+    check = app_module.is_ordering_closed
+
+    def run():
+        for d in dates:
+            check(d)
+
+    return run
+
+
+@case("open_dates")
+def open_dates(size):
+    return Menu(synthetic_options(size)).cutoffs.open_dates
+
+
+@case("cart_pricing")
+def cart_pricing(size):
+    menu = Menu(synthetic_options(size))
+    cart = {d: "Meal 1" for d in menu.dates}
+    return lambda: menu.prices.price_cart(cart)
+
+
+def _order_history(size):
+    """Replace all orders with ``size`` orders for one user, five per payment"""
+    with app.app_context():
+        db.session.execute(delete(Order))
+        db.session.execute(delete(User))
+        user = User(username="bench", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        db.session.execute(
+            insert(Order),
+            [
+                {
+                    "user_id": user.id,
+                    "date": FIRST_DATE + timedelta(days=i),
+                    "meal_name": f"Meal {i % 4}",
+                    "payment_intent_id": f"pi_{i // 5:08d}",
+                }
+                for i in range(size)
+            ],
+        )
+        db.session.commit()
+        return user.id
+
+
+@case("dashboard_confirmations")
+def dashboard_confirmations(size):
+    user_id = _order_history(size)
+    week = [(FIRST_DATE + timedelta(days=i)).isoformat() for i in range(5)]
+    per_page = app.config["CONFIRMATIONS_PER_PAGE"]
+
+    def run():
+        with app.app_context():
+            confirmations_page(user_id, per_page)
+            orders_by_date(user_id, week)
+
+    return run
+
+
+@case("session_round_trip", max_size=10_000)
+def session_round_trip(size):
+    """Open a stored session holding a cart of ``size`` days, change it, save it"""
+    interface = app.session_interface
+    menu = Menu(synthetic_options(size))
+    with app.test_request_context():
+        session = interface.open_session(app, app_module.request)
+        session["cart"] = {d: "Meal 1" for d in menu.dates}
+        session["user_id"] = 1
+        response = app.response_class()
+        interface.save_session(app, session, response)
+        cookie = response.headers["Set-Cookie"].split(";")[0]
+
+    def run():
+        with app.test_request_context(headers={"Cookie": cookie}):
+            session = interface.open_session(app, app_module.request)
+            session["visits"] = session.get("visits", 0) + 1
+            interface.save_session(app, session, app.response_class())
+
+    return run
+
+
+@case("dashboard_render", max_size=10_000)
+def dashboard_render(size):
+    menu = Menu(synthetic_options(size))
+    confirmations, _ = _confirmations_for_render()
+    open_dates = set(menu.dates)
+    context = {
+        "confirmations": confirmations,
+        "next_cursor": None,
+        "lunch_options": menu.options,
+        "location": app_module.LOCATION,
+        "week_dates": menu.dates,
+        "orders": {d: "Meal 0" for d in menu.dates[::2]},
+        "cart": {d: "Meal 1" for d in menu.dates[1::2]},
+        "ordering_closed": {d: False for d in menu.dates},
+    }
+
+    def run():
+        with app.test_request_context("/dashboard"):
+            # Normally set by before_request
+            g.cart = context["cart"]
+            g.menu = menu
+            g.lunch_options = menu.options
+            # As in the dashboard view: the shared menu markup comes from the
+            # per-worker fragment cache, so only the first run renders it
+            fragments = app_module.menu_fragments(menu, open_dates)
+            render_template("dashboard.html", fragments=fragments, **context)
+
+    return run
+
+
+def _confirmations_for_render():
+    user_id = _order_history(100)
+    with app.app_context():
+        return confirmations_page(user_id, app.config["CONFIRMATIONS_PER_PAGE"])
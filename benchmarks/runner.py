@@ -0,0 +1,93 @@
+import json
+import platform
+import statistics
+import time
+
+# Time each measurement for at least this long, calling the function in a loop
+MIN_MEASURE_TIME = 0.05
+
+
+def measure(func, repeat=5):
+    """Return per-call timings in seconds for ``repeat`` measurements.
+
+    The loop count is calibrated first so each measurement runs for at least
+    MIN_MEASURE_TIME, which keeps timer resolution out of fast benchmarks.
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_MEASURE_TIME or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < MIN_MEASURE_TIME / 10 else 2
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+    return timings
+
+
+def run_cases(cases, sizes, repeat=5, selected=None, log=None):
+    """Run each case at each size it supports; returns {"name[size]": stats}"""
+    results = {}
+    for name, case in cases.items():
+        if selected and name not in selected:
+            continue
+        for size in sizes:
+            if size > case.max_size:
+                continue
+            func = case.setup(size)
+            timings = measure(func, repeat)
+            key = f"{name}[{size}]"
+            results[key] = {
+                "median_s": statistics.median(timings),
+                "min_s": min(timings),
+                "repeat": repeat,
+            }
+            if log:
+                log(f"{key:<40} {_format_seconds(results[key]['median_s'])}")
+    return results
+
+
+def save(results, path):
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(baseline, current, threshold):
+    """Compare median timings present in both runs.
+
+    Returns rows of (key, baseline_s, current_s, ratio, regressed), where a
+    regression is a current median more than ``threshold`` (0.1 = 10%) slower.
+    """
+    rows = []
+    for key in sorted(baseline.keys() & current.keys()):
+        before = baseline[key]["median_s"]
+        after = current[key]["median_s"]
+        ratio = after / before if before else float("inf")
+        rows.append((key, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def _format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
@@ -0,0 +1,75 @@
+"""Conditional GETs for pages that only change when their inputs do.
+
+A view decorated with ``etag(make_tag)`` gets a weak ETag built from the
+values make_tag() returns, and answers a matching If-None-Match with a 304
+before the view runs, so neither its queries nor its template are run.
+make_tag() must be cheap: build it from values the request has already
+loaded, such as the menu snapshot, the session and current_user.
+"""
+
+import hashlib
+import os
+from functools import wraps
+
+from flask import current_app, request
+
+
+def release_tag(*directories):
+    """Digest of the files under directories, such as the templates.
+
+    Part of every ETag, so a deploy that changes a template or static file
+    does not leave browsers on pages cached from the previous release.
+    """
+    digest = hashlib.sha1()
+    for directory in directories:
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, directory).encode("utf-8"))
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+
+
+def etag(make_tag, public_max_age=None):
+    """Serve 304 Not Modified when the client has the page make_tag() names.
+
+    make_tag() returns a tuple of the page's inputs, or None when the page
+    must not be served from cache (for example when it will show flashed
+    messages).  Pages are private and revalidated on every view, unless
+    public_max_age is given: then shared caches such as a reverse proxy may
+    keep them for that many seconds.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            parts = make_tag() if request.method == "GET" else None
+            if parts is None:
+                return view(*args, **kwargs)
+
+            tag = make_etag(*parts)
+            if request.if_none_match.contains_weak(tag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(tag, weak=True)
+            if public_max_age is not None:
+                response.cache_control.public = True
+                response.cache_control.max_age = public_max_age
+            else:
+                # Let the browser keep the page but check back on every view
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+            return response
+
+        return wrapped
+
+    return decorator
@@ -0,0 +1,50 @@
+import bisect
+import time
+from datetime import datetime
+
+import pytz
+
+from config import get_timezone, get_cutoff_time
+
+
+class CutoffSchedule:
+    """Ordering cutoff for each menu date as a UTC Unix timestamp.
+
+    Each date is localized on its own, so dates either side of a DST
+    transition get the correct UTC offset.  Checking a date is then a single
+    integer comparison against the current time.
+    """
+
+    def __init__(self, dates, tz=None, cutoff_time=None):
+        self.tz = tz or get_timezone()
+        self.cutoff_time = cutoff_time or get_cutoff_time()
+        self.cutoffs = {date: self._compute(date) for date in dates}
+
+        # Sorted by cutoff so open_dates() can bisect instead of scanning
+        ordered = sorted(self.cutoffs.items(), key=lambda item: item[1])
+        self._ordered_dates = [date for date, _ in ordered]
+        self._ordered_cutoffs = [cutoff for _, cutoff in ordered]
+
+    def _compute(self, date_str):
+        date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        cutoff_local = self.tz.localize(datetime.combine(date, self.cutoff_time))
+        return int(cutoff_local.astimezone(pytz.UTC).timestamp())
+
+    def cutoff(self, date_str):
+        """Return the cutoff timestamp, computing it for dates off the menu"""
+        cutoff = self.cutoffs.get(date_str)
+        if cutoff is None:
+            cutoff = self._compute(date_str)
+        return cutoff
+
+    def is_closed(self, date_str, now=None):
+        if now is None:
+            now = int(time.time())
+        return now >= self.cutoff(date_str)
+
+    def open_dates(self, now=None):
+        """Return the set of menu dates still open for ordering"""
+        if now is None:
+            now = int(time.time())
+        first_open = bisect.bisect_right(self._ordered_cutoffs, now)
+        return set(self._ordered_dates[first_open:])
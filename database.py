@@ -1,12 +1,92 @@
 import logging
 import os
 import fcntl
-from models import db
-from sqlalchemy import inspect
+from models import ORDER_TRIGGERS, db
+from sqlalchemy import create_engine, event, inspect, text
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# SQLite pragmas applied to every new connection, selected with DB_PROFILE.
+# "production" lets readers run alongside the single writer (WAL), waits for
+# the write lock instead of failing with "database is locked", and only
+# fsyncs at checkpoints, which is safe in WAL mode.
+ENGINE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "busy_timeout": 5000,  # milliseconds
+        "synchronous": "NORMAL",
+        "cache_size": -16000,  # negative means KiB, so 16 MB per connection
+        "mmap_size": 128 * 1024 * 1024,
+    },
+}
+
+
+def get_engine_profile():
+    """Return the name and pragmas of the configured engine profile"""
+    name = os.environ.get("DB_PROFILE", "production")
+    if name not in ENGINE_PROFILES:
+        raise ValueError(
+            f"Unknown DB_PROFILE '{name}', expected one of {sorted(ENGINE_PROFILES)}"
+        )
+    return name, ENGINE_PROFILES[name]
+
+
+def get_engine_options():
+    """Size the connection pool from the gunicorn thread count.
+
+    Each worker thread holds at most one connection, plus a little overflow
+    for background threads in the same process.
+    """
+    threads = int(os.environ.get("GUNICORN_THREADS", 2))
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", threads)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 2)),
+        "pool_timeout": 10,
+    }
+
+
+def apply_pragmas(engine, pragmas):
+    """Run the profile's pragmas on every connection the engine opens"""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def get_read_only_engine(app):
+    """Engine for reports that opens the app's database read-only.
+
+    In WAL mode these readers never block the live app's writes.
+    """
+    db_path = app.config["SQLALCHEMY_DATABASE_URI"].removeprefix("sqlite:///")
+    engine = create_engine(f"sqlite:///file:{db_path}?mode=ro&uri=true")
+    apply_pragmas(engine, {"query_only": 1, "busy_timeout": 5000})
+    return engine
+
+
+def report_engine_settings(app):
+    """Log and return the effective SQLite settings of a live connection"""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            settings = {
+                name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                for name in (
+                    "journal_mode",
+                    "busy_timeout",
+                    "synchronous",
+                    "cache_size",
+                    "mmap_size",
+                )
+            }
+        settings["pool_size"] = db.engine.pool.size()
+    logger.info(f"SQLite engine settings: {settings}")
+    return settings
+
 
 def tables_exist(app):
     """Check if all required tables exist"""
@@ -17,15 +97,56 @@ def tables_exist(app):
         return required_tables.issubset(existing_tables)
 
 
+def migrate_db(app):
+    """Create any tables, columns and indexes declared on the models that are missing.
+
+    create_all() skips tables that already exist along with their indexes, so
+    columns and indexes added to an existing table are created one by one.
+    New columns must have a server_default, as SQLite requires one to add a
+    NOT NULL column.
+    """
+    with app.app_context():
+        db.create_all()
+        inspector = inspect(db.engine)
+        for table in db.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    add_column(table, column)
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        create_triggers()
+
+
+def add_column(table, column):
+    column_type = column.type.compile(db.engine.dialect)
+    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+    with db.engine.begin() as conn:
+        conn.execute(text(ddl))
+    logger.info(f"Added column {table.name}.{column.name}")
+
+
+def create_triggers():
+    with db.engine.begin() as conn:
+        for ddl in ORDER_TRIGGERS:
+            conn.execute(text(ddl))
+
+
 def init_db(app):
     """Initialize the database, create tables if they don't exist"""
     try:
         with app.app_context():
             if tables_exist(app):
                 logger.info("Required tables already exist")
+                migrate_db(app)
                 return True
 
             db.create_all()
+            create_triggers()
             logger.info("Database tables created successfully")
             return True
     except Exception as e:
@@ -33,14 +154,21 @@ def init_db(app):
         raise
 
 
+def get_data_dir():
+    """The directory holding instance/ and data/: DATA_DIR, or the app's own"""
+    if os.environ.get("DATA_DIR"):
+        return os.path.abspath(os.environ.get("DATA_DIR"))
+    return os.path.abspath(os.path.dirname(__file__))
+
+
+def database_uri(data_dir):
+    return f"sqlite:///{os.path.join(data_dir, 'instance', 'lunch.db')}"
+
+
 def setup_db(app):
     """Setup database configuration and initialize it"""
     try:
-        # Get data directory
-        if os.environ.get("DATA_DIR"):
-            DATA_DIR = os.path.abspath(os.environ.get("DATA_DIR"))
-        else:
-            DATA_DIR = os.path.abspath(os.path.dirname(__file__))
+        DATA_DIR = get_data_dir()
         logger.info(f"Using data directory: {DATA_DIR}")
 
         # Create instance directory if it doesn't exist
@@ -68,13 +196,19 @@ def setup_db(app):
                     logger.info(f"Database file already exists at {db_path}")
 
                 # Configure SQLAlchemy
-                app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+                app.config["SQLALCHEMY_DATABASE_URI"] = database_uri(DATA_DIR)
+                app.config["SQLALCHEMY_ENGINE_OPTIONS"] = get_engine_options()
+                profile, pragmas = get_engine_profile()
+                logger.info(f"Using database engine profile: {profile}")
 
                 # Initialize the db with the app
                 db.init_app(app)
+                with app.app_context():
+                    apply_pragmas(db.engine, pragmas)
 
                 # Initialize tables if needed
                 init_db(app)
+                report_engine_settings(app)
 
                 return DATA_DIR
 
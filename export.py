@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from models import Order, User
+
+# Field order of an exported order
+FIELDS = [
+    "id",
+    "date",
+    "user",
+    "restaurant",
+    "meal",
+    "price_cents",
+    "payment_intent_id",
+]
+
+# Rows fetched from the cursor at a time
+BATCH_SIZE = 500
+
+
+def export_rows(conn, menu, start=None, end=None, restaurant=None):
+    """Yield every matching order as a dict of FIELDS, oldest first.
+
+    ``conn`` is a Connection or Session.  Rows are read from the cursor in
+    batches of BATCH_SIZE and never collected, so memory stays flat however
+    many orders there are.  The restaurant and price come from the menu;
+    they are None for orders whose date or meal is no longer on it.
+    """
+    orders = Order.__table__
+    users = User.__table__
+    stmt = (
+        select(
+            orders.c.id,
+            orders.c.date,
+            users.c.username,
+            orders.c.meal_name,
+            orders.c.payment_intent_id,
+        )
+        .join_from(orders, users, orders.c.user_id == users.c.id)
+        .order_by(orders.c.date, orders.c.id)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    if start is not None:
+        stmt = stmt.where(orders.c.date >= start)
+    if end is not None:
+        stmt = stmt.where(orders.c.date <= end)
+    if restaurant is not None:
+        dates = [d for d, name in menu.restaurants.items() if name == restaurant]
+        stmt = stmt.where(orders.c.date.in_(dates))
+
+    for row in conn.execute(stmt):
+        date_str = row.date.isoformat()
+        on_menu = menu.has_meal(date_str, row.meal_name)
+        yield {
+            "id": row.id,
+            "date": date_str,
+            "user": row.username,
+            "restaurant": menu.restaurants.get(date_str),
+            "meal": row.meal_name,
+            "price_cents": (
+                menu.prices.price(date_str, row.meal_name) if on_menu else None
+            ),
+            "payment_intent_id": row.payment_intent_id,
+        }
+
+
+def csv_lines(rows):
+    """Encode rows as CSV, one chunk per row after the header"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+# format -> (encoder, mimetype)
+FORMATS = {
+    "csv": (csv_lines, "text/csv"),
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+}
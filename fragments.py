@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+from flask import get_template_attribute
+
+# Rendered menu markup shared by every user's pages:
+#   options_json  the whole menu as JSON, for the inline scripts
+#   headings      date -> the date, day and restaurant cells of the order table
+#   choices       date -> meal descriptions and select, for dates still open
+MenuFragments = namedtuple("MenuFragments", ["options_json", "headings", "choices"])
+
+
+class FragmentCache:
+    """Per-worker LRU cache of rendered template fragments.
+
+    Keys must change whenever the markup would, so entries never need to be
+    invalidated; old keys simply fall out once maxsize newer ones are used.
+    Two threads missing the same key at once may both render it.
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, render):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        value = render()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def menu_key(menu, open_dates):
+    """Cache key for the menu fragments: the menu version and the open dates"""
+    return (menu.version, frozenset(open_dates))
+
+
+def render_menu_fragments(menu, open_dates):
+    """Render the menu fragments; needs an app context"""
+    options_json = get_template_attribute("menu_fragments.html", "options_json")
+    heading = get_template_attribute("menu_fragments.html", "heading")
+    choices = get_template_attribute("menu_fragments.html", "choices")
+    return MenuFragments(
+        options_json=options_json(menu.options),
+        headings={date: heading(date, menu.restaurants[date]) for date in menu.dates},
+        choices={
+            date: choices(date, menu.options[date]["meals"])
+            for date in menu.dates
+            if date in open_dates
+        },
+    )
@@ -1,8 +1,41 @@
+import os
+import shutil
+import tempfile
+
 bind = "0.0.0.0:8000"
 workers = 4
 worker_class = "gthread"
-threads = 2
+# database.get_engine_options() sizes the connection pool from this value
+threads = int(os.environ.get("GUNICORN_THREADS", 2))
 timeout = 120
 accesslog = "-"
 errorlog = "-"
 loglevel = "info"
+
+# Must be set before any worker imports prometheus_client
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "lunch-metrics")
+)
+
+
+def post_worker_init(worker):
+    # Start the webhook inbox worker so events left from a previous run are
+    # drained without waiting for the next webhook to arrive
+    from app import app
+    from webhooks import start_worker
+
+    start_worker(app)
+
+
+def on_starting(server):
+    # Workers share metrics through files in this directory (see metrics.py);
+    # start each run with it empty so counters from old workers are dropped
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+from models import User
+
+
+class UserRecord:
+    """Detached, read-only view of a User row for Flask-Login's current_user.
+
+    Carries only what request handling needs, so it can be shared between
+    requests without holding on to a database session.
+    """
+
+    __slots__ = ("id", "username")
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+    def get_id(self):
+        return str(self.id)
+
+    def __repr__(self):
+        return f"<UserRecord {self.id} {self.username!r}>"
+
+
+class UserCache:
+    """Bounded LRU cache of UserRecords that expire after ttl seconds.
+
+    Each worker process has its own cache.  Changes made through the ORM in
+    this process invalidate the entry straight away (see watch_users); other
+    workers pick them up once the entry expires.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+        """Return the UserRecord for user_id, loading it on a miss.
+
+        Returns None if the user does not exist; misses are not cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        row = (
+            User.query.with_entities(User.id, User.username)
+            .filter_by(id=user_id)
+            .first()
+        )
+        if row is None:
+            return None
+        record = UserRecord(row.id, row.username)
+        with self._lock:
+            self._entries[user_id] = (record, now + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return record
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def watch_users(cache):
+    """Invalidate cache entries when a User is inserted, updated or deleted.
+
+    Only ORM flushes are seen; bulk query.update()/delete() calls bypass these
+    events and must invalidate the cache themselves.
+    """
+
+    def invalidate(mapper, connection, target):
+        cache.invalidate(target.id)
+
+    for name in ("after_insert", "after_update", "after_delete"):
+        event.listen(User, name, invalidate)
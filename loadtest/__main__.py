@@ -0,0 +1,55 @@
+import argparse
+import json
+import sys
+
+from loadtest.harness import run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m loadtest",
+        description="Drive attendee journeys against gunicorn and report latency",
+    )
+    parser.add_argument("--journeys", type=int, default=50, help="attendees to run")
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="attendees in flight at once"
+    )
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument(
+        "--threads", type=int, default=2, help="gunicorn threads per worker"
+    )
+    parser.add_argument("--days", type=int, default=5, help="menu days to order")
+    parser.add_argument(
+        "--stripe-latency",
+        type=float,
+        default=0.0,
+        help="seconds the Stripe stand-in waits before answering",
+    )
+    parser.add_argument("--output", help="write the JSON report here, not stdout")
+    parser.add_argument(
+        "--keep-data",
+        action="store_true",
+        help="keep the temporary DATA_DIR (database, gunicorn.log) afterwards",
+    )
+    args = parser.parse_args(argv)
+
+    report = run(
+        journeys=args.journeys,
+        concurrency=args.concurrency,
+        workers=args.workers,
+        threads=args.threads,
+        days=args.days,
+        stripe_latency=args.stripe_latency,
+        keep_data=args.keep_data,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0 if report["journeys"]["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
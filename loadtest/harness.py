@@ -0,0 +1,325 @@
+"""Boot the app under gunicorn and drive attendee journeys against it.
+
+Each journey is one new attendee: register, log in, view the dashboard,
+fill the cart for every open day, check out, land on the confirmation page
+and have Stripe's webhook arrive.  Latency is recorded per route.
+"""
+
+import http.client
+import json
+import os
+import re
+import secrets
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from loadtest.stripe_stub import StripeStub, sign_payload, succeeded_event
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEBHOOK_SECRET = "whsec_loadtest"
+PASSWORD = "loadtest-password"
+
+CLIENT_SECRET = re.compile(r"(pi_[A-Za-z0-9]+)_secret_")
+
+
+class JourneyError(Exception):
+    pass
+
+
+class Recorder:
+    """Thread-safe latency samples and error counts per route"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, route, seconds, ok):
+        with self.lock:
+            self.samples[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = max(1, int(-(-fraction * len(ordered) // 1)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _stats(samples, errors, elapsed):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "error_rate": round(errors / len(ordered), 4) if ordered else 0.0,
+        "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        **{
+            f"p{int(p * 100)}_ms": round(percentile(ordered, p) * 1000, 2)
+            for p in (0.5, 0.95, 0.99)
+        },
+    }
+
+
+def summarize(recorder, elapsed):
+    routes = {
+        route: _stats(samples, recorder.errors[route], elapsed)
+        for route, samples in sorted(recorder.samples.items())
+    }
+    every = [s for samples in recorder.samples.values() for s in samples]
+    overall = _stats(every, sum(recorder.errors.values()), elapsed) if every else {}
+    return {"routes": routes, "overall": overall}
+
+
+class Client:
+    """Keep-alive HTTP client with its own cookie jar.
+
+    The app marks its session cookie Secure, which a standards-following
+    cookie jar would refuse to send over plain HTTP to 127.0.0.1.
+    """
+
+    def __init__(self, port, recorder):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        self.cookies = {}
+        self.recorder = recorder
+
+    def request(self, route, path, form=None, body=None, headers=None, expect=200):
+        method = route.split(" ", 1)[0]
+        headers = dict(headers or {})
+        if form is not None:
+            body = urlencode(form).encode("utf-8")
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.recorder.add(route, time.perf_counter() - started, False)
+            self.conn.close()
+            raise JourneyError(f"{route}: {e}")
+        elapsed = time.perf_counter() - started
+
+        for header in response.headers.get_all("Set-Cookie") or []:
+            cookie = SimpleCookie(header)
+            for name, morsel in cookie.items():
+                self.cookies[name] = morsel.value
+
+        ok = response.status == expect
+        self.recorder.add(route, elapsed, ok)
+        if not ok:
+            raise JourneyError(f"{route}: expected {expect}, got {response.status}")
+        return data
+
+    def close(self):
+        self.conn.close()
+
+
+def journey(port, stub, menu, recorder, username):
+    client = Client(port, recorder)
+    try:
+        credentials = {"username": username, "password": PASSWORD}
+        client.request("GET /register", "/register")
+        client.request("POST /register", "/register", form=credentials, expect=302)
+        client.request("POST /login", "/login", form=credentials, expect=302)
+        client.request("GET /dashboard", "/dashboard")
+
+        selections = {f"meal_{d}": meals[0] for d, meals in menu.items()}
+        client.request("POST /add_to_cart", "/add_to_cart", form=selections, expect=302)
+
+        page = client.request("GET /checkout", "/checkout").decode("utf-8")
+        match = CLIENT_SECRET.search(page)
+        if not match:
+            raise JourneyError("GET /checkout: no client secret on the page")
+        intent_id = match.group(1)
+
+        query = urlencode({"payment_intent": intent_id, "redirect_status": "succeeded"})
+        client.request("GET /confirmation", f"/confirmation?{query}")
+
+        payload = json.dumps(succeeded_event(stub.intents[intent_id])).encode("utf-8")
+        client.request(
+            "POST /webhook",
+            "/webhook",
+            body=payload,
+            headers={
+                "Content-Type": "application/json",
+                "Stripe-Signature": sign_payload(payload, WEBHOOK_SECRET),
+            },
+        )
+        return True
+    except JourneyError:
+        return False
+    finally:
+        client.close()
+
+
+def write_menu(data_dir, days, start=None):
+    """Write a menu of the repo's meals re-dated to upcoming weekdays.
+
+    Returns {date: [meal names]} for the dates written.
+    """
+    with open(os.path.join(REPO_ROOT, "data", "lunch_options.json")) as f:
+        template = list(json.load(f)["daily_options"].values())
+
+    day = start or date.today() + timedelta(days=2)
+    options = {}
+    while len(options) < days:
+        if day.weekday() < 5:
+            options[day.isoformat()] = template[len(options) % len(template)]
+        day += timedelta(days=1)
+
+    os.makedirs(os.path.join(data_dir, "data"), exist_ok=True)
+    with open(os.path.join(data_dir, "data", "lunch_options.json"), "w") as f:
+        json.dump({"daily_options": options}, f)
+    return {
+        d: [meal["name"] for meal in day_options["meals"] if meal["name"] != "None"]
+        for d, day_options in options.items()
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_ready(process, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/login")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"gunicorn did not answer within {timeout}s")
+
+
+def app_env(data_dir, stub, threads):
+    """Environment for the gunicorn under test, kept inside data_dir"""
+    return dict(
+        os.environ,
+        DATA_DIR=data_dir,
+        # gunicorn.conf.py empties this on start; the default is shared with
+        # any other server on the machine
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(data_dir, "metrics"),
+        SECRET_KEY=secrets.token_hex(32),
+        STRIPE_SECRET_KEY="sk_test_loadtest",
+        STRIPE_PUBLIC_KEY="pk_test_loadtest",
+        STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+        STRIPE_API_BASE=stub.url,
+        GUNICORN_THREADS=str(threads),
+    )
+
+
+def start_app(data_dir, port, stub, workers, threads):
+    env = app_env(data_dir, stub, threads)
+    log = open(os.path.join(data_dir, "gunicorn.log"), "wb")
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "gunicorn.conf.py",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(workers),
+            "wsgi:application",
+        ],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+    log.close()
+    return process
+
+
+def stop_app(process):
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+def run(
+    journeys=50,
+    concurrency=10,
+    workers=4,
+    threads=2,
+    days=5,
+    stripe_latency=0.0,
+    keep_data=False,
+    startup_timeout=60,
+):
+    """Run the load test and return the report as a dict"""
+    data_dir = tempfile.mkdtemp(prefix="lunch-loadtest-")
+    menu = write_menu(data_dir, days)
+    stub = StripeStub(latency=stripe_latency).start()
+    port = _free_port()
+    process = start_app(data_dir, port, stub, workers, threads)
+    recorder = Recorder()
+    try:
+        _wait_until_ready(process, port, startup_timeout)
+        run_id = secrets.token_hex(3)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(
+                pool.map(
+                    lambda i: journey(port, stub, menu, recorder, f"load-{run_id}-{i}"),
+                    range(journeys),
+                )
+            )
+        elapsed = time.perf_counter() - started
+    finally:
+        stop_app(process)
+        stub.stop()
+        if not keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {
+        "config": {
+            "journeys": journeys,
+            "concurrency": concurrency,
+            "gunicorn_workers": workers,
+            "gunicorn_threads": threads,
+            "menu_days": days,
+            "stripe_latency_s": stripe_latency,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "journeys": {
+            "completed": sum(results),
+            "failed": len(results) - sum(results),
+            "per_second": round(journeys / elapsed, 2) if elapsed else 0.0,
+        },
+        **summarize(recorder, elapsed),
+    }
+    if keep_data:
+        report["data_dir"] = data_dir
+    return report
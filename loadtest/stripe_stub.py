@@ -0,0 +1,150 @@
+"""Local stand-in for the parts of the Stripe API the app uses.
+
+PaymentIntents are kept in memory.  A created intent reports
+requires_payment_method; the first retrieve after creation reports it as
+succeeded, as if the browser had confirmed the payment in between.
+"""
+
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+class StripeStub:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        # Seconds added to every response, to mimic the real API's round trip
+        self.latency = latency
+        self.intents = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _handler(self))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="stripe-stub", daemon=True
+        )
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def create_intent(self, form):
+        intent_id = "pi_" + secrets.token_hex(12)
+        intent = {
+            "id": intent_id,
+            "object": "payment_intent",
+            "amount": int(form.get("amount", 0)),
+            "currency": form.get("currency", "usd"),
+            "status": "requires_payment_method",
+            "client_secret": f"{intent_id}_secret_{secrets.token_hex(8)}",
+            "metadata": _metadata(form),
+            "created": int(time.time()),
+        }
+        with self.lock:
+            self.intents[intent_id] = intent
+        return intent
+
+    def update_intent(self, intent_id, form):
+        with self.lock:
+            intent = self.intents.get(intent_id)
+            if intent is None:
+                return None
+            if "amount" in form:
+                intent["amount"] = int(form["amount"])
+            intent["metadata"].update(_metadata(form))
+            return dict(intent)
+
+    def retrieve_intent(self, intent_id):
+        with self.lock:
+            intent = self.intents.get(intent_id)
+            if intent is None:
+                return None
+            intent["status"] = "succeeded"
+            return dict(intent)
+
+
+def _metadata(form):
+    return {
+        key[len("metadata[") : -1]: value
+        for key, value in form.items()
+        if key.startswith("metadata[")
+    }
+
+
+def _handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            form = dict(parse_qsl(self.rfile.read(length).decode("utf-8")))
+            parts = self.path.strip("/").split("/")
+            if parts == ["v1", "payment_intents"]:
+                self._reply(stub.create_intent(form))
+            elif parts[:2] == ["v1", "payment_intents"] and len(parts) == 3:
+                self._reply(stub.update_intent(parts[2], form))
+            else:
+                self._reply(None)
+
+        def do_GET(self):
+            parts = self.path.split("?")[0].strip("/").split("/")
+            if parts[:2] == ["v1", "payment_intents"] and len(parts) == 3:
+                self._reply(stub.retrieve_intent(parts[2]))
+            else:
+                self._reply(None)
+
+        def _reply(self, body):
+            if stub.latency:
+                time.sleep(stub.latency)
+            status = 200
+            if body is None:
+                status = 404
+                body = {
+                    "error": {
+                        "type": "invalid_request_error",
+                        "message": f"No such resource: {self.path}",
+                    }
+                }
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Stripe-Signature header value for a webhook payload (bytes)"""
+    if timestamp is None:
+        timestamp = int(time.time())
+    signed = f"{timestamp}.".encode("utf-8") + payload
+    signature = hmac.new(secret.encode("utf-8"), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def succeeded_event(intent):
+    """A payment_intent.succeeded event for an intent dict"""
+    return {
+        "id": "evt_" + secrets.token_hex(12),
+        "object": "event",
+        "type": "payment_intent.succeeded",
+        "created": int(time.time()),
+        "data": {"object": dict(intent, status="succeeded")},
+    }
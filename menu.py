@@ -0,0 +1,91 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from cutoffs import CutoffSchedule
+from pricing import PriceBook
+
+logger = logging.getLogger(__name__)
+
+
+class Menu:
+    """Immutable snapshot of the lunch options with precomputed lookups."""
+
+    def __init__(self, options, version=None):
+        self.options = options
+        if version is None:
+            version = _content_version(
+                json.dumps(options, sort_keys=True).encode("utf-8")
+            )
+        self.version = version
+
+        # Dates in file order, which is the order the dashboard shows them
+        self.dates = list(options.keys())
+        # Chronological, for range lookups by the JSON API
+        self.sorted_dates = sorted(self.dates)
+        self.restaurants = {
+            date: day.get("restaurant") for date, day in options.items()
+        }
+        self.meals = {
+            (date, meal["name"]): meal
+            for date, day in options.items()
+            for meal in day["meals"]
+        }
+        self.cutoffs = CutoffSchedule(self.dates)
+        self.prices = PriceBook(options)
+
+    def meal(self, date, name):
+        """Return the meal dict for (date, name), or None if it is not offered"""
+        return self.meals.get((date, name))
+
+    def has_meal(self, date, name):
+        return (date, name) in self.meals
+
+
+class MenuCatalog:
+    """Per-process cache of the menu file.
+
+    The file is parsed once and re-read only when its inode, mtime or size
+    changes.  The stat itself is throttled to once per ``check_interval``
+    seconds so the hot path is a clock read and an attribute lookup.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._menu = None
+        self._signature = None
+        self._checked_at = 0.0
+
+    def get(self):
+        menu = self._menu
+        now = time.monotonic()
+        if menu is not None and now - self._checked_at < self.check_interval:
+            return menu
+
+        stat = os.stat(self.path)
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if self._menu is None or signature != self._signature:
+                self._menu = self._load()
+                self._signature = signature
+                logger.info(
+                    f"Loaded menu {self._menu.version} with "
+                    f"{len(self._menu.dates)} date(s) from {self.path}"
+                )
+            self._checked_at = now
+            return self._menu
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        return Menu(data["daily_options"], version=_content_version(raw))
+
+
+def _content_version(raw):
+    return hashlib.sha1(raw).hexdigest()[:12]
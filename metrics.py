@@ -0,0 +1,162 @@
+"""Prometheus metrics shared by every gunicorn worker.
+
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py sets it), each worker
+writes its samples to files in that directory and /metrics adds them up
+across workers.  Without it, as in tests, the metrics live in this process.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+# Request latencies run from fast redirects to scrypt logins and Stripe calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    "lunch_request_duration_seconds",
+    "Time to handle a request",
+    ["endpoint", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "lunch_requests_total",
+    "Requests handled",
+    ["endpoint", "method", "status"],
+)
+IN_FLIGHT = Gauge(
+    "lunch_requests_in_flight",
+    "Requests being handled right now",
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Histogram(
+    "lunch_db_queries_per_request",
+    "Database queries issued while handling a request",
+    ["endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+DB_TIME = Histogram(
+    "lunch_db_seconds_per_request",
+    "Time spent in database queries while handling a request",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+STRIPE_LATENCY = Histogram(
+    "lunch_stripe_request_duration_seconds",
+    "Stripe API call latency",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+STRIPE_ERRORS = Counter(
+    "lunch_stripe_errors_total",
+    "Stripe API calls that raised",
+    ["operation", "error"],
+)
+SESSION_LATENCY = Histogram(
+    "lunch_session_store_duration_seconds",
+    "Session store read and write latency",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+WEBHOOK_LAG = Histogram(
+    "lunch_webhook_lag_seconds",
+    "Time from receiving a webhook event to finishing processing it",
+    ["type", "status"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600),
+)
+
+
+@contextmanager
+def stripe_call(operation):
+    """Time a Stripe API call and count it if it raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STRIPE_ERRORS.labels(operation, type(e).__name__).inc()
+        raise
+    finally:
+        STRIPE_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+
+def observe_session(operation, seconds):
+    SESSION_LATENCY.labels(operation).observe(seconds)
+
+
+def observe_webhook(event_type, status, received_at):
+    WEBHOOK_LAG.labels(event_type, status).observe(time.time() - received_at)
+
+
+def _endpoint():
+    return request.url_rule.endpoint if request.url_rule else "unmatched"
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.db_queries = 0
+    g.db_seconds = 0.0
+    IN_FLIGHT.inc()
+
+
+def _after_request(response):
+    REQUESTS.labels(_endpoint(), request.method, response.status_code).inc()
+    return response
+
+
+def _teardown_request(exc):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return
+    IN_FLIGHT.dec()
+    endpoint = _endpoint()
+    REQUEST_LATENCY.labels(endpoint, request.method).observe(
+        time.perf_counter() - started
+    )
+    DB_QUERIES.labels(endpoint).observe(g.db_queries)
+    DB_TIME.labels(endpoint).observe(g.db_seconds)
+
+
+def _count_queries(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        context.metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and "db_queries" in g:
+            g.db_queries += 1
+            g.db_seconds += time.perf_counter() - context.metrics_started
+
+
+def metrics_response():
+    """Body and content type for the /metrics endpoint"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_app(app, engine):
+    """Record request metrics for app and query metrics for engine.
+
+    Call before the app registers its own before_request hooks so the
+    latency includes them.
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    _count_queries(engine)
@@ -0,0 +1,25 @@
+import os
+import sys
+
+from app import app, DATA_DIR
+from sessions import migrate_filesystem_sessions
+
+# Copy sessions from the old flask_session FileSystemCache directory into the
+# SQLite session store so logged-in users stay logged in across the upgrade.
+session_dir = (
+    sys.argv[1] if len(sys.argv) > 1 else os.path.join(DATA_DIR, "flask_session")
+)
+
+if not os.path.isdir(session_dir):
+    print(f"No session directory at {session_dir}, nothing to migrate.")
+    sys.exit(0)
+
+interface = app.session_interface
+migrated, skipped = migrate_filesystem_sessions(
+    session_dir, interface.store, interface.serializer
+)
+print(f"Migrated {migrated} session(s), skipped {skipped} expired or unreadable.")
+
+# Move the directory aside so a second run cannot overwrite newer sessions
+os.rename(session_dir, session_dir + ".migrated")
+print(f"Renamed {session_dir} to {session_dir}.migrated")
@@ -10,6 +10,10 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(120), nullable=False)
+    # Bumped by the ORDER_TRIGGERS below whenever this user's orders change
+    orders_version = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
     orders = db.relationship("Order", backref="user", lazy=True)
 
 
@@ -17,6 +21,12 @@ class Order(db.Model):
     __tablename__ = "orders"
     __table_args__ = (
         db.UniqueConstraint("user_id", "date", name="uq_order_user_date"),
+        # Webhook and confirmation idempotency checks
+        db.Index("ix_orders_payment_intent_id", "payment_intent_id"),
+        # Print confirmation and the per-user receipts list
+        db.Index("ix_orders_user_payment_intent", "user_id", "payment_intent_id"),
+        # Kitchen reports for a single day
+        db.Index("ix_orders_date", "date"),
         {"extend_existing": True},
     )
     id = db.Column(db.Integer, primary_key=True)
@@ -24,3 +34,63 @@ class Order(db.Model):
     date = db.Column(db.Date, nullable=False)
     meal_name = db.Column(db.String(100), nullable=False)
     payment_intent_id = db.Column(db.String(100), nullable=True)
+
+
+# Keep users.orders_version current for every write to orders, including the
+# admin CLI and the webhook worker, so pages can be cached against it
+ORDER_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS orders_version_insert AFTER INSERT ON orders
+    BEGIN
+        UPDATE users SET orders_version = orders_version + 1 WHERE id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS orders_version_update AFTER UPDATE ON orders
+    BEGIN
+        UPDATE users SET orders_version = orders_version + 1
+        WHERE id IN (OLD.user_id, NEW.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS orders_version_delete AFTER DELETE ON orders
+    BEGIN
+        UPDATE users SET orders_version = orders_version + 1 WHERE id = OLD.user_id;
+    END""",
+]
+
+
+class WebhookEvent(db.Model):
+    """Verified Stripe event waiting in the inbox for the background worker"""
+
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        # The worker claims due events with status IN (...) AND next_attempt_at <= now
+        db.Index("ix_webhook_events_status_due", "status", "next_attempt_at"),
+        {"extend_existing": True},
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    # Stripe's evt_ id; Stripe retries redeliver the same id
+    event_id = db.Column(db.String(100), unique=True, nullable=False)
+    type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    # pending -> processing -> done, or back to pending for a retry, or dead
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    # Unix timestamps
+    received_at = db.Column(db.Float, nullable=False)
+    next_attempt_at = db.Column(db.Float, nullable=False)
+    processed_at = db.Column(db.Float, nullable=True)
+
+
+class Payment(db.Model):
+    """Local copy of a Stripe PaymentIntent, keyed by its pi_ id"""
+
+    __tablename__ = "payments"
+    __table_args__ = (
+        db.Index("ix_payments_user_id", "user_id"),
+        {"extend_existing": True},
+    )
+    id = db.Column(db.String(100), primary_key=True)
+    status = db.Column(db.String(40), nullable=False)
+    amount = db.Column(db.Integer, nullable=False)  # cents
+    currency = db.Column(db.String(3), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    cart = db.Column(db.Text, nullable=False)  # JSON snapshot of the paid cart
+    updated_at = db.Column(db.Float, nullable=False)  # Unix timestamp
@@ -0,0 +1,237 @@
+import json
+import logging
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from models import db, Order, User
+
+logger = logging.getLogger(__name__)
+
+OrderWriteResult = namedtuple("OrderWriteResult", ["inserted", "updated", "unchanged"])
+
+# One paid cart: its dates and meals, newest first
+Confirmation = namedtuple(
+    "Confirmation", ["payment_intent_id", "last_date", "dates", "meals"]
+)
+
+
+def save_orders(user_id, selections):
+    """Write one order per date for a user without reading the rows first.
+
+    ``selections`` maps "YYYY-MM-DD" strings to meal names.  New dates are
+    inserted with ``INSERT ... ON CONFLICT(user_id, date) DO NOTHING`` against
+    the uq_order_user_date constraint; dates that already had an order are
+    then updated in one statement, skipping rows whose meal is unchanged.
+    Both statements run in the caller's transaction, so concurrent inserts
+    never raise IntegrityError.  The caller is responsible for committing.
+
+    Returns an OrderWriteResult of sorted date strings.
+    """
+    if not selections:
+        return OrderWriteResult([], [], [])
+
+    table = Order.__table__
+    meals = {
+        datetime.strptime(date_str, "%Y-%m-%d").date(): meal_name
+        for date_str, meal_name in selections.items()
+    }
+
+    insert_stmt = (
+        insert(table)
+        .values(
+            [
+                {"user_id": user_id, "date": date, "meal_name": meal_name}
+                for date, meal_name in meals.items()
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "date"])
+        .returning(table.c.date)
+    )
+    inserted = {row.date for row in db.session.execute(insert_stmt)}
+
+    existing = {date: meal for date, meal in meals.items() if date not in inserted}
+    updated = set()
+    if existing:
+        new_meal = case(existing, value=table.c.date)
+        update_stmt = (
+            update(table)
+            .where(
+                table.c.user_id == user_id,
+                table.c.date.in_(existing),
+                table.c.meal_name != new_meal,
+            )
+            .values(meal_name=new_meal)
+            .returning(table.c.date)
+        )
+        updated = {row.date for row in db.session.execute(update_stmt)}
+
+    unchanged = set(meals) - inserted - updated
+    result = OrderWriteResult(
+        _date_strings(inserted), _date_strings(updated), _date_strings(unchanged)
+    )
+    logger.debug(
+        f"Saved orders for user {user_id}: inserted={result.inserted}, "
+        f"updated={result.updated}, unchanged={result.unchanged}"
+    )
+    return result
+
+
+def save_paid_orders(user_id, cart, payment_intent_id):
+    """Insert the orders of a paid cart in one statement.
+
+    Both the confirmation page and the webhook save a paid cart, so dates
+    the user already has an order for are left alone with ``ON CONFLICT DO
+    NOTHING`` instead of failing on uq_order_user_date.  Returns the sorted
+    date strings inserted.  The caller is responsible for committing.
+    """
+    if not cart:
+        return []
+    table = Order.__table__
+    stmt = (
+        insert(table)
+        .values(
+            [
+                {
+                    "user_id": user_id,
+                    "date": datetime.strptime(date_str, "%Y-%m-%d").date(),
+                    "meal_name": meal_name,
+                    "payment_intent_id": payment_intent_id,
+                }
+                for date_str, meal_name in cart.items()
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "date"])
+        .returning(table.c.date)
+    )
+    return _date_strings(row.date for row in db.session.execute(stmt))
+
+
+def _date_strings(dates):
+    return sorted(date.strftime("%Y-%m-%d") for date in dates)
+
+
+def orders_by_date(user_id, dates):
+    """Map "YYYY-MM-DD" -> meal name for a user's orders between the first
+    and last of ``dates``"""
+    if not dates:
+        return {}
+    table = Order.__table__
+    first = datetime.strptime(min(dates), "%Y-%m-%d").date()
+    last = datetime.strptime(max(dates), "%Y-%m-%d").date()
+    rows = db.session.execute(
+        select(table.c.date, table.c.meal_name).where(
+            table.c.user_id == user_id, table.c.date.between(first, last)
+        )
+    )
+    return {row.date.strftime("%Y-%m-%d"): row.meal_name for row in rows}
+
+
+def orders_version(user_id):
+    """The user's orders_version, bumped by the triggers on every order write.
+
+    Read by primary key on every conditional GET rather than cached, since
+    the webhook worker and other processes write orders too.
+    """
+    return db.session.execute(
+        select(User.orders_version).where(User.id == user_id)
+    ).scalar_one_or_none()
+
+
+def orders_page(user_id, limit, start=None, end=None, after=None):
+    """One page of a user's orders between start and end, oldest first.
+
+    ``after`` is the date of the last order on the previous page.  Dates
+    are date objects.  Returns (rows, next_cursor) with next_cursor the
+    "YYYY-MM-DD" to pass as ``after``, or None on the last page.
+    """
+    table = Order.__table__
+    stmt = (
+        select(table.c.date, table.c.meal_name, table.c.payment_intent_id)
+        .where(table.c.user_id == user_id)
+        .order_by(table.c.date)
+        .limit(limit + 1)
+    )
+    if start is not None:
+        stmt = stmt.where(table.c.date >= start)
+    if end is not None:
+        stmt = stmt.where(table.c.date <= end)
+    if after is not None:
+        stmt = stmt.where(table.c.date > after)
+
+    rows = db.session.execute(stmt).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, rows[-1].date.isoformat()
+
+
+def confirmations_page(user_id, limit, before=None):
+    """One page of a user's confirmations, grouped by payment intent in SQL.
+
+    Confirmations are ordered by their latest order date, newest first, with
+    the payment intent id as a tie-breaker.  ``before`` is the cursor of the
+    last confirmation on the previous page (see parse_cursor).
+
+    Returns (confirmations, next_cursor); next_cursor is None on the last page.
+    """
+    table = Order.__table__
+    last_date = func.max(table.c.date).label("last_date")
+    stmt = (
+        select(
+            table.c.payment_intent_id,
+            last_date,
+            func.json_group_array(func.json_array(table.c.date, table.c.meal_name)),
+        )
+        .where(table.c.user_id == user_id, table.c.payment_intent_id.is_not(None))
+        .group_by(table.c.payment_intent_id)
+        .order_by(last_date.desc(), table.c.payment_intent_id.desc())
+        .limit(limit + 1)
+    )
+    if before is not None:
+        before_date, before_id = before
+        stmt = stmt.having(
+            or_(
+                last_date < before_date,
+                and_(last_date == before_date, table.c.payment_intent_id < before_id),
+            )
+        )
+
+    confirmations = []
+    for payment_intent_id, latest, items in db.session.execute(stmt):
+        # Each group is a handful of rows; order them here rather than relying
+        # on the aggregate's input order
+        items = sorted(json.loads(items), reverse=True)
+        confirmations.append(
+            Confirmation(
+                payment_intent_id,
+                latest,
+                [date for date, _ in items],
+                [meal for _, meal in items],
+            )
+        )
+
+    if len(confirmations) <= limit:
+        return confirmations, None
+    confirmations = confirmations[:limit]
+    last = confirmations[-1]
+    return confirmations, f"{last.last_date.isoformat()}:{last.payment_intent_id}"
+
+
+def parse_cursor(cursor):
+    """Turn a confirmations_page() cursor back into (date, payment_intent_id).
+
+    Returns None for a missing or malformed cursor, which means the first page.
+    """
+    if not cursor:
+        return None
+    date_str, _, payment_intent_id = cursor.partition(":")
+    try:
+        date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+    if not payment_intent_id:
+        return None
+    return date, payment_intent_id
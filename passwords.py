@@ -0,0 +1,89 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+# werkzeug method string, spelled out in full so needs_rehash() can compare it
+# with the prefix of a stored hash ("scrypt:32768:8:1$salt$hash")
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool is full or too slow to answer"""
+
+
+class PasswordHasher:
+    """Hash and verify passwords in a small process pool.
+
+    scrypt holds the GIL for the whole hash, so running it on a request
+    thread stalls every other request in the worker.  At most max_pending
+    calls may be queued or running at once; beyond that, calls raise
+    HasherBusy straight away instead of waiting.  With workers=0 the work
+    runs inline on the calling thread (used by the tests).
+
+    The pool is started on first use so that each gunicorn worker creates
+    its own after forking.
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, workers=1, max_pending=4, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._pid = os.getpid()
+            return self._pool
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy("password hashing queue is full")
+        if not self.workers:
+            try:
+                return func(*args)
+            finally:
+                self._slots.release()
+        try:
+            future = self._executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # A running job cannot be cancelled, so its slot is only freed once
+        # the job itself finishes, not when the caller stops waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise HasherBusy("password hashing timed out")
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with a different method or cost"""
+        return password_hash.split("$", 1)[0] != self.method
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+import stripe
+from sqlalchemy.dialects.sqlite import insert
+
+from models import db, Payment
+
+logger = logging.getLogger(__name__)
+
+# PaymentIntent statuses that Stripe will not change again
+FINAL_STATUSES = {"succeeded", "canceled"}
+# PaymentIntent statuses in which the customer can still pay, so checkout
+# may show the intent again
+PAYABLE_STATUSES = {
+    "requires_payment_method",
+    "requires_confirmation",
+    "requires_action",
+}
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one call.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait for it and share its result or exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_intent_fetches = SingleFlight()
+
+
+def record_intent(payment_intent_id, status, amount, currency, metadata):
+    """Insert or refresh the ledger row for a PaymentIntent.
+
+    A row that already has a final status is never changed, so a stale read
+    from Stripe cannot undo what the webhook recorded.  The caller commits.
+    """
+    user_id = metadata["user_id"] if "user_id" in metadata else None
+    values = {
+        "id": payment_intent_id,
+        "status": status,
+        "amount": amount,
+        "currency": currency,
+        "user_id": int(user_id) if user_id else None,
+        "cart": metadata["cart"] if "cart" in metadata else "{}",
+        "updated_at": time.time(),
+    }
+    table = Payment.__table__
+    stmt = insert(table).values(**values)
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={key: stmt.excluded[key] for key in values if key != "id"},
+            where=table.c.status.not_in(FINAL_STATUSES),
+        )
+    )
+
+
+def fetch_intent(payment_intent_id, stripe_api):
+    """Retrieve a PaymentIntent, sharing one request between concurrent callers"""
+    return _intent_fetches.do(
+        payment_intent_id,
+        lambda: stripe_api.retrieve_payment_intent(payment_intent_id),
+    )
+
+
+def get_payment(payment_intent_id, stripe_api):
+    """Return the ledger row for a PaymentIntent, asking Stripe only if needed.
+
+    Stripe is called, through stripe_api, when there is no row yet or its
+    status is not final.
+    """
+    payment = db.session.get(Payment, payment_intent_id)
+    if payment is not None and payment.status in FINAL_STATUSES:
+        return payment
+
+    logger.info(f"Retrieving payment intent {payment_intent_id} from Stripe")
+    intent = fetch_intent(payment_intent_id, stripe_api)
+    record_intent(
+        payment_intent_id,
+        intent.status,
+        intent.amount,
+        intent.currency,
+        intent.metadata,
+    )
+    db.session.commit()
+    payment = db.session.get(Payment, payment_intent_id, populate_existing=True)
+    return payment
+
+
+def cart_snapshot(payment):
+    """Return the cart stored with a payment as a dict of date -> meal name"""
+    return json.loads(payment.cart or "{}")
+
+
+def checkout_key(user_id, cart, amount):
+    """Digest identifying what a checkout charges: the user, cart and amount"""
+    cart_json = json.dumps(cart, sort_keys=True)
+    return hashlib.sha256(f"{user_id}:{amount}:{cart_json}".encode()).hexdigest()
+
+
+def checkout_intent(stripe_api, user_id, cart, amount, saved=None, recheck_after=300):
+    """Return the PaymentIntent to show at checkout, as a dict for the session.
+
+    ``saved`` is the dict returned for this session's previous checkout.  Its
+    intent is reused while it can still be paid: as is when the cart and
+    amount are unchanged, or updated in place when they changed.  Its status
+    is re-read from Stripe once the ledger row is ``recheck_after`` seconds
+    old.  Otherwise a new intent is created under an idempotency key, so a
+    retried or repeated create returns the same intent.  A replayed intent
+    the ledger knows is paid, canceled or since updated to another cart or
+    amount is skipped by creating again under a key naming it.  The caller
+    commits.
+    """
+    key = checkout_key(user_id, cart, amount)
+    # Serialized as checkout_key does, so one key always carries the same params
+    metadata = {"cart": json.dumps(cart, sort_keys=True), "user_id": str(user_id)}
+
+    payment = db.session.get(Payment, saved["id"]) if saved else None
+    if payment is not None and payment.user_id == user_id:
+        if time.time() - payment.updated_at > recheck_after:
+            payment = get_payment(payment.id, stripe_api)
+        if payment.status in PAYABLE_STATUSES:
+            if saved["key"] == key:
+                return saved
+            try:
+                intent = stripe_api.update_payment_intent(
+                    payment.id, amount=amount, metadata=metadata
+                )
+            except stripe.InvalidRequestError as e:
+                # Paid or canceled since the ledger last heard about it
+                logger.info(f"Not reusing payment intent {payment.id}: {e}")
+            else:
+                record_intent(intent.id, intent.status, amount, "usd", metadata)
+                return dict(saved, key=key)
+
+    params = {
+        "amount": amount,
+        "currency": "usd",
+        "automatic_payment_methods": {"enabled": True},
+        "metadata": metadata,
+    }
+    previous_id = saved["id"] if saved else "new"
+    while True:
+        intent = stripe_api.create_payment_intent(
+            idempotency_key=f"checkout-{key}-{previous_id}", **params
+        )
+        # A replayed key returns the intent as it was created, so only the
+        # ledger knows whether it has been paid, or updated for another cart
+        payment = db.session.get(Payment, intent.id)
+        if payment is None or (
+            payment.status in PAYABLE_STATUSES
+            and payment.amount == amount
+            and payment.cart == metadata["cart"]
+        ):
+            break
+        logger.info(f"Checkout key replayed {payment.status} intent {intent.id}")
+        previous_id = intent.id
+    record_intent(intent.id, intent.status, amount, "usd", metadata)
+    return {"id": intent.id, "client_secret": intent.client_secret, "key": key}
@@ -0,0 +1,48 @@
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+LineItem = namedtuple("LineItem", ["date", "meal_name", "price_cents"])
+
+
+def to_cents(price):
+    """Convert a menu price in dollars (float or str) to integer cents"""
+    dollars = Decimal(str(price)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return int(dollars * 100)
+
+
+def format_cents(cents):
+    """Format integer cents as a dollar amount without a currency sign"""
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+class CartPricing:
+    """Line items and total for one cart, all amounts in integer cents."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.total_cents = sum(line.price_cents for line in lines)
+        self.prices = {line.date: line.price_cents for line in lines}
+
+
+class PriceBook:
+    """Meal prices in cents keyed by (date, meal_name)."""
+
+    def __init__(self, options):
+        self.cents = {
+            (date, meal["name"]): to_cents(meal["price"])
+            for date, day in options.items()
+            for meal in day["meals"]
+        }
+
+    def price(self, date, meal_name):
+        """Return the price in cents, or 0 for a meal that is not on the menu"""
+        return self.cents.get((date, meal_name), 0)
+
+    def price_cart(self, cart):
+        cents = self.cents
+        return CartPricing(
+            [
+                LineItem(date, meal_name, cents.get((date, meal_name), 0))
+                for date, meal_name in cart.items()
+            ]
+        )
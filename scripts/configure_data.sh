@@ -3,9 +3,11 @@
 # Create data directory
 mkdir -p /data/data
 mkdir -p /data/instance
-mkdir -p /data/flask_session
 
 # Move lunch_options.json to data directory
 mv data/lunch_options.json /data/data/lunch_options.json
 
+# Carry over sessions from the old filesystem session store (no-op once done)
+uv run python migrate_sessions.py
+
 uv run gunicorn --bind 0.0.0.0:8000 wsgi:application
\ No newline at end of file
@@ -0,0 +1,271 @@
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import struct
+import threading
+import time
+
+from flask_session.base import ServerSideSession, ServerSideSessionInterface
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+
+from metrics import observe_session
+
+logger = logging.getLogger(__name__)
+
+
+def hash_store_id(store_id):
+    """Row key for a session.
+
+    This is the same sha256 digest cachelib's FileSystemCache uses for file
+    names, which lets migrate_filesystem_sessions() carry sessions over
+    without knowing their ids.  It also keeps raw session ids out of the
+    database.
+    """
+    return hashlib.sha256(store_id.encode("utf-8")).hexdigest()
+
+
+# File name of the entry counter FileSystemCache keeps next to the sessions
+CACHELIB_COUNT_FILE = hash_store_id("__wz_cache_count")
+
+
+class SqliteSessionStore:
+    """Session rows in their own SQLite file, one connection per thread.
+
+    Sessions live in a separate database from lunch.db so session writes
+    never wait on the order tables' write lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id TEXT PRIMARY KEY,"
+                " data BLOB NOT NULL,"
+                " expiry REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_sessions_expiry ON sessions (expiry)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, store_id, now=None):
+        """Return (data, expiry), or None if missing or expired"""
+        if now is None:
+            now = time.time()
+        return (
+            self._connect()
+            .execute(
+                "SELECT data, expiry FROM sessions WHERE id = ? AND expiry > ?",
+                (hash_store_id(store_id), now),
+            )
+            .fetchone()
+        )
+
+    def get(self, store_id, now=None):
+        """Return the stored bytes, or None if missing or expired"""
+        row = self.load(store_id, now)
+        return row[0] if row else None
+
+    def set(self, store_id, data, expiry):
+        self.set_hashed(hash_store_id(store_id), data, expiry)
+
+    def set_hashed(self, row_id, data, expiry):
+        self._connect().execute(
+            "INSERT INTO sessions (id, data, expiry) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET data = excluded.data, expiry = excluded.expiry",
+            (row_id, data, expiry),
+        )
+
+    def delete(self, store_id):
+        self._connect().execute(
+            "DELETE FROM sessions WHERE id = ?", (hash_store_id(store_id),)
+        )
+
+    def delete_expired(self, batch_size=500, now=None):
+        """Delete expired rows in batches so no single write holds the lock long.
+
+        Returns the number of rows deleted.
+        """
+        if now is None:
+            now = time.time()
+        conn = self._connect()
+        deleted = 0
+        while True:
+            cursor = conn.execute(
+                "DELETE FROM sessions WHERE id IN ("
+                " SELECT id FROM sessions WHERE expiry <= ? LIMIT ?)",
+                (now, batch_size),
+            )
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return deleted
+
+
+def skip_session(view):
+    """Mark a view as not needing the session; it gets an empty null session"""
+    view.skip_session = True
+    return view
+
+
+class TrackedSession(ServerSideSession):
+    """Server-side session that remembers what was loaded from the store"""
+
+    def __init__(self, initial=None, sid=None, permanent=None):
+        super().__init__(initial, sid, permanent)
+        # Contents as stored, or None for a session that is not stored yet
+        self.original = None
+        # Unix time of the last write to the store
+        self.stored_at = None
+
+
+class SqliteSessionInterface(ServerSideSessionInterface):
+    """flask_session interface backed by SqliteSessionStore.
+
+    A session is written only when its contents differ from what was loaded,
+    or to push its expiry forward at most once per refresh_interval seconds.
+    The cookie is re-sent only alongside a write, so the browser's and the
+    store's expiry move together.
+
+    Expired rows are filtered out on read and purged in batches at most once
+    per cleanup_interval seconds per process, piggybacked on a session write.
+    """
+
+    ttl = True  # expiry is handled here, not by flask_session's cleanup hooks
+    session_class = TrackedSession
+
+    # Endpoints without a decorated view function, such as Flask's own static
+    skip_endpoints = {"static"}
+
+    def __init__(
+        self,
+        app,
+        store,
+        refresh_interval=300,
+        cleanup_interval=300,
+        cleanup_batch_size=500,
+    ):
+        config = app.config
+        super().__init__(
+            app,
+            key_prefix=config.get("SESSION_KEY_PREFIX", "session:"),
+            permanent=config.get("SESSION_PERMANENT", True),
+            serialization_format=config.get("SESSION_SERIALIZATION_FORMAT", "msgpack"),
+        )
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self._loaded = threading.local()
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch_size = cleanup_batch_size
+        self._cleanup_lock = threading.Lock()
+        self._last_cleanup = time.monotonic()
+
+    def _skips_session(self, app, request):
+        # The URL is not matched yet when the session is opened, so match it here
+        try:
+            endpoint, _ = app.create_url_adapter(request).match()
+        except (HTTPException, RequestRedirect):
+            return False
+        if endpoint in self.skip_endpoints:
+            return True
+        return getattr(app.view_functions.get(endpoint), "skip_session", False)
+
+    def open_session(self, app, request):
+        if self._skips_session(app, request):
+            return None  # Flask substitutes a null session that is never saved
+
+        self._loaded.row = None
+        session = super().open_session(app, request)
+        row = self._loaded.row
+        if row is not None:
+            data, expiry = row
+            session.original = self.serializer.decode(data)
+            lifetime = app.permanent_session_lifetime.total_seconds()
+            session.stored_at = expiry - lifetime
+        return session
+
+    def should_set_storage(self, app, session):
+        if session.original is None or dict(session) != session.original:
+            return True
+        return time.time() >= session.stored_at + self.refresh_interval
+
+    def should_set_cookie(self, app, session):
+        # Only reached after should_set_storage() chose to write
+        return True
+
+    def _retrieve_session_data(self, store_id):
+        started = time.perf_counter()
+        row = self.store.load(store_id)
+        observe_session("load", time.perf_counter() - started)
+        self._loaded.row = row
+        if row is None:
+            return None
+        return self.serializer.decode(row[0])
+
+    def _delete_session(self, store_id):
+        self.store.delete(store_id)
+
+    def _upsert_session(self, session_lifetime, session, store_id):
+        expiry = time.time() + session_lifetime.total_seconds()
+        started = time.perf_counter()
+        self.store.set(store_id, self.serializer.encode(session), expiry)
+        observe_session("save", time.perf_counter() - started)
+        self._maybe_cleanup()
+
+    def _maybe_cleanup(self):
+        now = time.monotonic()
+        if now - self._last_cleanup < self.cleanup_interval:
+            return
+        if not self._cleanup_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_cleanup = now
+            deleted = self.store.delete_expired(self.cleanup_batch_size)
+            if deleted:
+                logger.info(f"Deleted {deleted} expired session(s)")
+        finally:
+            self._cleanup_lock.release()
+
+
+def migrate_filesystem_sessions(session_dir, store, serializer):
+    """Copy unexpired cachelib FileSystemCache sessions into the store.
+
+    Each cache file is a 4-byte expiry timestamp (0 for none) followed by the
+    pickled session dict, and is named by the same hash the store uses as its
+    row key.  Returns (migrated, skipped).
+    """
+    migrated = skipped = 0
+    now = time.time()
+    for name in os.listdir(session_dir):
+        path = os.path.join(session_dir, name)
+        # Skip cachelib's entry counter and half-written temp files
+        if len(name) != 64 or name == CACHELIB_COUNT_FILE or not os.path.isfile(path):
+            continue
+        try:
+            with open(path, "rb") as f:
+                expires = struct.unpack("I", f.read(4))[0]
+                data = pickle.load(f)
+        except (OSError, EOFError, struct.error, pickle.UnpicklingError) as e:
+            logger.warning(f"Skipping unreadable session file {name}: {e}")
+            skipped += 1
+            continue
+        if expires != 0 and expires <= now:
+            skipped += 1
+            continue
+        expiry = expires if expires != 0 else now + 3600
+        store.set_hashed(name, serializer.encode(data), expiry)
+        migrated += 1
+    return migrated, skipped
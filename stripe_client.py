@@ -0,0 +1,99 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+
+from metrics import stripe_call
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds.  Stripe normally answers in well under
+# a second; these stop one slow call from holding a request thread for the
+# whole gunicorn timeout.
+DEFAULT_TIMEOUT = (2, 10)
+TIMEOUTS = {
+    "payment_intent.create": (2, 10),
+    "payment_intent.update": (2, 10),
+    "payment_intent.retrieve": (2, 5),
+}
+
+
+def pooled_session(pool_size):
+    """A requests session keeping up to pool_size keep-alive connections.
+
+    stripe.RequestsClient otherwise opens a session per thread; sharing this
+    one lets gunicorn threads reuse warm TLS connections.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class StripeAPI:
+    """The Stripe calls the app makes, with timeouts, retries and metrics.
+
+    The API key, version and base URL are read from the stripe module, where
+    app.py sets them.  The clients and their connection pool are created on
+    first use so that each gunicorn worker opens its own connections after
+    forking.
+    """
+
+    def __init__(self, max_retries=2, pool_size=10, timeouts=None):
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.timeouts = TIMEOUTS if timeouts is None else timeouts
+        self._lock = threading.Lock()
+        self._session = None
+        self._clients = {}
+        self._key = None
+
+    def client(self, timeout=DEFAULT_TIMEOUT):
+        """The StripeClient for calls with this (connect, read) timeout.
+
+        stripe.RequestsClient takes one timeout per client, so there is a
+        client per timeout; they all share the process's pooled session.
+        Retries are left to stripe, which sends the same Idempotency-Key on
+        every attempt of a POST.
+        """
+        key = (os.getpid(), stripe.api_key, stripe.api_base, stripe.api_version)
+        with self._lock:
+            if self._key != key:
+                self._session = pooled_session(self.pool_size)
+                self._clients = {}
+                self._key = key
+            if timeout not in self._clients:
+                self._clients[timeout] = stripe.StripeClient(
+                    stripe.api_key,
+                    stripe_version=stripe.api_version,
+                    base_addresses={"api": stripe.api_base},
+                    max_network_retries=self.max_retries,
+                    http_client=stripe.RequestsClient(
+                        session=self._session, timeout=timeout
+                    ),
+                )
+            return self._clients[timeout]
+
+    @contextmanager
+    def _operation(self, name):
+        timeout = self.timeouts.get(name, DEFAULT_TIMEOUT)
+        with stripe_call(name):
+            yield self.client(timeout).v1
+
+    def create_payment_intent(self, idempotency_key=None, **params):
+        options = {"idempotency_key": idempotency_key} if idempotency_key else {}
+        with self._operation("payment_intent.create") as v1:
+            return v1.payment_intents.create(params=params, options=options)
+
+    def update_payment_intent(self, payment_intent_id, **params):
+        with self._operation("payment_intent.update") as v1:
+            return v1.payment_intents.update(payment_intent_id, params=params)
+
+    def retrieve_payment_intent(self, payment_intent_id):
+        with self._operation("payment_intent.retrieve") as v1:
+            return v1.payment_intents.retrieve(payment_intent_id)
@@ -3,18 +3,24 @@ import tempfile
 from unittest.mock import patch
 
 import pytest
+from sqlalchemy import event
 from werkzeug.security import generate_password_hash
 
 # DATA_DIR must be set before importing app so setup_db writes to a temp dir.
 _tmpdir = tempfile.mkdtemp()
 os.environ.setdefault("DATA_DIR", _tmpdir)
+# Hash passwords inline; test_passwords.py exercises the process pool itself.
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
 
-from app import app as flask_app  # noqa: E402
-from models import db, User, Order  # noqa: E402
+from app import app as flask_app, user_cache  # noqa: E402
+from menu import Menu  # noqa: E402
+from models import db, User, Order, Payment, WebhookEvent  # noqa: E402
 
 # Allow session cookies over HTTP in the test client.
 flask_app.config["TESTING"] = True
 flask_app.config["SESSION_COOKIE_SECURE"] = False
+# Tests drain the webhook inbox explicitly instead of via the background thread.
+flask_app.config["WEBHOOK_WORKER_ENABLED"] = False
 
 # Minimal lunch options for tests.  Shared so tests and conftest use the same data.
 MOCK_LUNCH_OPTIONS = {
@@ -27,15 +33,18 @@ MOCK_LUNCH_OPTIONS = {
 }
 
 
+MOCK_MENU = Menu(MOCK_LUNCH_OPTIONS)
+
+
 @pytest.fixture(autouse=True)
 def mock_lunch_options():
-    """Prevent load_lunch_options() from hitting the filesystem on every request.
+    """Serve MOCK_LUNCH_OPTIONS instead of reading the menu file.
 
-    before_request() calls load_lunch_options() for every HTTP request, including
-    the login endpoint, so this must be active for all tests that use the client.
+    before_request() calls get_menu() for every page request, including the
+    login endpoint, so this must be active for all tests that use the client.
     Individual tests may re-patch with the same value; that is harmless.
     """
-    with patch("app.load_lunch_options", return_value=MOCK_LUNCH_OPTIONS):
+    with patch("app.get_menu", return_value=MOCK_MENU):
         yield
 
 
@@ -44,8 +53,12 @@ def clean_database():
     """Wipe all rows before each test so tests are independent."""
     with flask_app.app_context():
         db.session.query(Order).delete()
+        db.session.query(Payment).delete()
         db.session.query(User).delete()
+        db.session.query(WebhookEvent).delete()
         db.session.commit()
+    # Bulk deletes bypass the ORM events, and SQLite reuses the freed ids
+    user_cache.clear()
     yield
 
 
@@ -54,6 +67,47 @@ def client():
     return flask_app.test_client()
 
 
+class QueryCounter:
+    """Record the SQL statements an engine runs while the counter is active.
+
+    Used through the count_queries fixture to hold routes to a query budget::
+
+        with count_queries() as queries:
+            client.get("/dashboard")
+        assert queries.count <= 3
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def __repr__(self):
+        listing = "\n".join(f"  {s}" for s in self.statements)
+        return f"<QueryCounter {self.count} queries>\n{listing}"
+
+
+@pytest.fixture
+def count_queries():
+    """Return a context manager that counts the queries run inside it"""
+    with flask_app.app_context():
+        engine = db.engine
+    return lambda: QueryCounter(engine)
+
+
 @pytest.fixture
 def test_user(clean_database):
     """Create a test user and return their id."""
@@ -72,8 +126,8 @@ def logged_in_user(client, clean_database):
     """Create a test user, log them in via the login endpoint, and return an
     object with .id so tests can reference the user's primary key.
 
-    Because the app uses a server-side cachelib session, this fixture drives a
-    real login request so Flask-Login stores a valid session in the cache.
+    Because the app uses a server-side SQLite session, this fixture drives a
+    real login request so Flask-Login stores a valid session in the store.
     """
     with flask_app.app_context():
         user = User(
@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+from datetime import date
+
+import admin
+from app import app as flask_app
+from database import get_read_only_engine
+from models import Order, User, db
+from tests.conftest import MOCK_MENU
+
+
+def _seed(test_user):
+    with flask_app.app_context():
+        other = User(username="alice", password_hash="x")
+        db.session.add(other)
+        db.session.commit()
+        db.session.add_all(
+            [
+                Order(
+                    user_id=test_user,
+                    date=date(2025, 4, 28),
+                    meal_name="Soup",
+                    payment_intent_id="pi_1",
+                ),
+                Order(
+                    user_id=test_user,
+                    date=date(2025, 4, 29),
+                    meal_name="Salad",
+                    payment_intent_id="pi_1",
+                ),
+                Order(
+                    user_id=other.id,
+                    date=date(2025, 4, 28),
+                    meal_name="Soup",
+                    payment_intent_id="pi_2",
+                ),
+                Order(user_id=other.id, date=date(2025, 5, 2), meal_name="Salad"),
+            ]
+        )
+        db.session.commit()
+
+
+def _run(*argv):
+    out = io.StringIO()
+    assert admin.main(list(argv), out=out) == 0
+    return out.getvalue()
+
+
+def test_kitchen_sheet_covers_the_date_range(test_user):
+    _seed(test_user)
+    engine = get_read_only_engine(flask_app)
+    with engine.connect() as conn:
+        orders, summary = admin.kitchen_sheet(
+            conn, date(2025, 4, 28), date(2025, 4, 29)
+        )
+    engine.dispose()
+
+    assert [(o["date"].isoformat(), o["user"]) for o in orders.rows] == [
+        ("2025-04-28", "alice"),
+        ("2025-04-28", "testuser"),
+        ("2025-04-29", "testuser"),
+    ]
+    assert [(s["date"].isoformat(), s["meal"], s["count"]) for s in summary.rows] == [
+        ("2025-04-28", "Soup", 2),
+        ("2025-04-29", "Salad", 1),
+    ]
+
+
+def test_reports_in_csv_and_json(test_user):
+    _seed(test_user)
+
+    rows = list(
+        csv.DictReader(io.StringIO(_run("orders", "2025-04-28", "--format", "csv")))
+    )
+    assert [r["user"] for r in rows] == ["alice", "testuser"]
+
+    report = json.loads(_run("payment", "pi_1", "--format", "json"))
+    assert [o["date"] for o in report["orders"]] == ["2025-04-28", "2025-04-29"]
+    assert report["totals"] == [{"orders": 2, "users": 1}]
+
+    table = _run("all-orders", "--date-range", "2025-05-01", "2025-05-31")
+    assert "2025-05-02" in table and "2025-04-28" not in table
+
+
+def test_reports_do_not_migrate_the_database(test_user, monkeypatch):
+    _seed(test_user)
+
+    def setup_db(app):
+        raise AssertionError("a report ran setup_db")
+
+    monkeypatch.setattr(admin, "setup_db", setup_db)
+    monkeypatch.setattr(admin, "load_menu", lambda app: MOCK_MENU)
+
+    assert "Soup" in _run("orders", "2025-04-28")
+    assert "Salad" in _run("all-orders")
+    assert "pi_1" in _run("payment", "pi_1")
+    _run("duplicates")
+    assert "Soup" in _run("export")
+
+
+def test_read_only_connection_cannot_write(test_user):
+    engine = get_read_only_engine(flask_app)
+    try:
+        with engine.connect() as conn:
+            try:
+                conn.exec_driver_sql("DELETE FROM orders")
+            except Exception as e:
+                assert "readonly" in str(e) or "read-only" in str(e)
+            else:
+                raise AssertionError("read-only connection accepted a write")
+    finally:
+        engine.dispose()
+
+
+def test_remove_deletes_the_payment_orders(test_user):
+    _seed(test_user)
+
+    output = _run("remove", "pi_1", "--yes")
+
+    assert "Deleted 2 order(s)." in output
+    with flask_app.app_context():
+        assert Order.query.filter_by(payment_intent_id="pi_1").count() == 0
+        assert Order.query.count() == 2
@@ -0,0 +1,236 @@
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from app import app as flask_app
+from menu import Menu
+from models import Order, db
+from tests.conftest import login
+from tests.test_webhook import _make_event, _post_webhook
+
+MEAL = {"name": "Test Meal", "type": "C", "desc": "A test meal", "price": 25.00}
+WEEK_MENU = Menu(
+    {
+        day: {"restaurant": f"Restaurant {day}", "meals": [MEAL]}
+        for day in ("2025-04-28", "2025-04-29", "2025-04-30", "2099-01-05")
+    }
+)
+
+
+@pytest.fixture
+def week_menu():
+    with patch("app.get_menu", return_value=WEEK_MENU):
+        yield
+
+
+def _add_orders(user_id, *days, payment_intent_id=None):
+    with flask_app.app_context():
+        for day in days:
+            db.session.add(
+                Order(
+                    user_id=user_id,
+                    date=date.fromisoformat(day),
+                    meal_name="Test Meal",
+                    payment_intent_id=payment_intent_id,
+                )
+            )
+        db.session.commit()
+
+
+def test_menu(client):
+    response = client.get("/api/v1/menu")
+
+    assert response.status_code == 200
+    assert response.json == {
+        "data": [
+            {
+                "date": "2025-04-28",
+                "restaurant": "Test Restaurant",
+                "meals": [
+                    {
+                        "name": "Test Meal",
+                        "type": "C",
+                        "description": "A test meal",
+                        "price_cents": 2500,
+                    }
+                ],
+            }
+        ],
+        "next_cursor": None,
+    }
+    assert "public" in response.headers["Cache-Control"]
+    assert "Set-Cookie" not in response.headers
+
+
+def test_menu_pages_through_a_date_range(client, week_menu):
+    first = client.get("/api/v1/menu?start=2025-04-29&limit=2&fields=date")
+    second = client.get(
+        f"/api/v1/menu?start=2025-04-29&limit=2&fields=date"
+        f"&cursor={first.json['next_cursor']}"
+    )
+    bounded = client.get("/api/v1/menu?end=2025-04-29&fields=date")
+
+    assert first.json == {
+        "data": [{"date": "2025-04-29"}, {"date": "2025-04-30"}],
+        "next_cursor": "2025-04-30",
+    }
+    assert second.json == {"data": [{"date": "2099-01-05"}], "next_cursor": None}
+    assert [day["date"] for day in bounded.json["data"]] == [
+        "2025-04-28",
+        "2025-04-29",
+    ]
+
+
+@pytest.mark.parametrize(
+    "query, message",
+    [
+        ("fields=date,price", "unknown field(s): price"),
+        ("start=28-04-2025", "start must be a date in YYYY-MM-DD format"),
+        ("start=2025-04-30&end=2025-04-28", "start must not be after end"),
+        ("limit=0", "limit must be between 1 and 200"),
+        ("limit=ten", "limit must be an integer"),
+    ],
+)
+def test_bad_arguments_are_rejected(client, query, message):
+    response = client.get(f"/api/v1/menu?{query}")
+
+    assert response.status_code == 400
+    assert response.json == {"error": message}
+
+
+def test_dates(client, week_menu):
+    response = client.get("/api/v1/dates?fields=date,open")
+
+    assert response.json["data"] == [
+        {"date": "2025-04-28", "open": False},
+        {"date": "2025-04-29", "open": False},
+        {"date": "2025-04-30", "open": False},
+        {"date": "2099-01-05", "open": True},
+    ]
+    cutoff = client.get("/api/v1/dates?limit=1").json["data"][0]["cutoff"]
+    assert cutoff.startswith("2025-04-2") and cutoff.endswith("Z")
+
+
+def test_unchanged_menu_is_not_modified(client, count_queries):
+    first = client.get("/api/v1/menu")
+
+    with count_queries() as queries:
+        second = client.get(
+            "/api/v1/menu", headers={"If-None-Match": first.headers["ETag"]}
+        )
+
+    assert second.status_code == 304
+    assert queries.count == 0, queries
+
+
+def test_etag_covers_the_arguments(client):
+    tags = {
+        client.get(f"/api/v1/menu{query}").headers["ETag"]
+        for query in ("", "?fields=date", "?fields=meals&limit=1", "?start=2025-04-29")
+    }
+    # Spelled differently, parsed the same
+    same = client.get("/api/v1/menu?fields=meals,restaurant,date&limit=50")
+
+    assert len(tags) == 4
+    assert same.headers["ETag"] == client.get("/api/v1/menu").headers["ETag"]
+
+
+def test_bad_arguments_are_rejected_before_revalidation(client):
+    tag = client.get("/api/v1/menu").headers["ETag"]
+
+    response = client.get("/api/v1/menu?limit=abc", headers={"If-None-Match": tag})
+
+    assert response.status_code == 400
+    assert response.json == {"error": "limit must be an integer"}
+
+
+@pytest.mark.parametrize("path", ["/api/v1/me/orders", "/api/v1/me/confirmations"])
+def test_user_endpoints_require_login(client, path):
+    response = client.get(path)
+
+    assert response.status_code == 401
+    assert response.json == {"error": "login required"}
+
+
+def test_my_orders_pages_oldest_first(client, test_user):
+    _add_orders(test_user, "2025-04-30", "2025-04-28", "2025-04-29")
+    login(client)
+
+    first = client.get("/api/v1/me/orders?limit=2&fields=date,meal")
+    second = client.get(
+        f"/api/v1/me/orders?limit=2&fields=date,meal&cursor={first.json['next_cursor']}"
+    )
+
+    assert first.json == {
+        "data": [
+            {"date": "2025-04-28", "meal": "Test Meal"},
+            {"date": "2025-04-29", "meal": "Test Meal"},
+        ],
+        "next_cursor": "2025-04-29",
+    }
+    assert second.json == {
+        "data": [{"date": "2025-04-30", "meal": "Test Meal"}],
+        "next_cursor": None,
+    }
+    assert "private" in first.headers["Cache-Control"]
+
+
+def test_my_orders_etag_changes_with_my_orders(client, test_user):
+    login(client)
+    first = client.get("/api/v1/me/orders")
+    assert first.json["data"] == []
+
+    client.post("/order", data={"meal_2025-04-28": "Test Meal"})
+    second = client.get(
+        "/api/v1/me/orders", headers={"If-None-Match": first.headers["ETag"]}
+    )
+
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert second.json["data"][0]["date"] == "2025-04-28"
+
+
+@pytest.mark.parametrize("path", ["/api/v1/me/orders", "/api/v1/me/confirmations"])
+def test_webhook_orders_change_my_etags(client, test_user, path):
+    login(client)
+    first = client.get(path)
+    assert first.json["data"] == []
+
+    # The inbox worker writes the orders; this worker's user cache stays warm
+    _post_webhook(client, _make_event(test_user, {"2025-04-28": "Test Meal"}))
+    second = client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert second.json["data"][0]["payment_intent_id"] == "pi_test_webhook_123"
+
+
+def test_my_confirmations(client, test_user):
+    _add_orders(test_user, "2025-04-28", "2025-04-29", payment_intent_id="pi_1")
+    _add_orders(test_user, "2025-04-30", payment_intent_id="pi_2")
+    login(client)
+
+    first = client.get("/api/v1/me/confirmations?limit=1")
+    second = client.get(
+        f"/api/v1/me/confirmations?limit=1&cursor={first.json['next_cursor']}"
+    )
+
+    assert first.json == {
+        "data": [
+            {
+                "payment_intent_id": "pi_2",
+                "dates": ["2025-04-30"],
+                "meals": ["Test Meal"],
+            }
+        ],
+        "next_cursor": "2025-04-30:pi_2",
+    }
+    assert second.json["data"] == [
+        {
+            "payment_intent_id": "pi_1",
+            "dates": ["2025-04-29", "2025-04-28"],
+            "meals": ["Test Meal", "Test Meal"],
+        }
+    ]
+    assert second.json["next_cursor"] is None
@@ -0,0 +1,86 @@
+import gzip
+import os
+
+import brotli
+import pytest
+from flask import Flask, url_for
+
+import assets
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+
+
+@pytest.fixture
+def built(tmp_path):
+    dist_dir = str(tmp_path / "dist")
+    return dist_dir, assets.build(STATIC_DIR, dist_dir)
+
+
+@pytest.fixture
+def asset_app(built):
+    dist_dir, _ = built
+    app = Flask(__name__, static_folder=STATIC_DIR)
+    assets.init_app(app, dist_dir)
+    return app
+
+
+def test_build_writes_hashed_and_compressed_copies(built):
+    dist_dir, manifest = built
+
+    hashed = manifest["js/cart.js"]
+    assert hashed.startswith("js/cart.") and hashed.endswith(".js")
+    with open(os.path.join(STATIC_DIR, "js", "cart.js"), "rb") as f:
+        original = f.read()
+    with open(os.path.join(dist_dir, hashed + ".gz"), "rb") as f:
+        assert gzip.decompress(f.read()) == original
+    with open(os.path.join(dist_dir, hashed + ".br"), "rb") as f:
+        assert brotli.decompress(f.read()) == original
+    # PNGs are already compressed
+    assert not os.path.exists(
+        os.path.join(dist_dir, manifest["cppnow-logo.png"] + ".gz")
+    )
+
+
+def test_build_is_repeatable(tmp_path, built):
+    _, manifest = built
+
+    assert assets.build(STATIC_DIR, str(tmp_path / "again")) == manifest
+
+
+def test_url_for_resolves_to_the_hashed_name(asset_app, built):
+    _, manifest = built
+
+    with asset_app.test_request_context():
+        url = url_for("static", filename="js/cart.js")
+
+    assert url == f"/static/dist/{manifest['js/cart.js']}"
+
+
+def test_hashed_files_are_served_precompressed_and_immutable(asset_app):
+    with asset_app.test_request_context():
+        url = url_for("static", filename="js/cart.js")
+    client = asset_app.test_client()
+
+    br = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    gz = client.get(url, headers={"Accept-Encoding": "gzip"})
+    plain = client.get(url)
+
+    assert br.headers["Content-Encoding"] == "br"
+    assert gz.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in plain.headers
+    assert brotli.decompress(br.data) == gzip.decompress(gz.data) == plain.data
+    assert plain.mimetype == "text/javascript"
+    for response in (br, gz, plain):
+        assert "immutable" in response.headers["Cache-Control"]
+        assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_unbuilt_static_files_are_served_as_before(tmp_path):
+    app = Flask(__name__, static_folder=STATIC_DIR)
+    assets.init_app(app, str(tmp_path / "missing"))
+
+    with app.test_request_context():
+        assert url_for("static", filename="js/cart.js") == "/static/js/cart.js"
+    response = app.test_client().get("/static/js/cart.js")
+    assert response.status_code == 200
+    assert "immutable" not in response.headers.get("Cache-Control", "")
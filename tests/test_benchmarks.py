@@ -0,0 +1,27 @@
+from benchmarks.runner import compare, measure
+
+
+def test_measure_returns_per_call_timings():
+    timings = measure(lambda: sum(range(100)), repeat=3)
+    assert len(timings) == 3
+    assert all(0 < t < 0.05 for t in timings)
+
+
+def test_compare_flags_slowdowns_over_threshold():
+    baseline = {
+        "a[10]": {"median_s": 1.0},
+        "b[10]": {"median_s": 1.0},
+        "old": {"median_s": 1.0},
+    }
+    current = {
+        "a[10]": {"median_s": 1.05},
+        "b[10]": {"median_s": 1.5},
+        "new": {"median_s": 1.0},
+    }
+
+    rows = compare(baseline, current, threshold=0.1)
+
+    assert [(key, regressed) for key, _, _, _, regressed in rows] == [
+        ("a[10]", False),
+        ("b[10]", True),
+    ]
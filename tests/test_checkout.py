@@ -6,27 +6,31 @@ import app as app_module
 
 
 def _inject_cart(client, cart, user_id):
-    """Inject a cart into the server-side cachelib session.
+    """Inject a cart into the server-side SQLite session.
 
-    Flask-session stores data in a FileSystemCache keyed by the session cookie
-    value.  session_transaction() only touches the signed cookie, not the
-    server-side store, so we must write directly to the cache.
+    The session store is keyed by the session cookie value.
+    session_transaction() only touches the signed cookie, not the server-side
+    store, so we must write directly to the store.
     """
     cookie = client.get_cookie("session")
     if cookie is None:
         return
-    session_id = cookie.value
-    cache = flask_app.config["SESSION_CACHELIB"]
-    session_data = cache.get("session:" + session_id) or {}
+    interface = flask_app.session_interface
+    store_id = interface._get_store_id(cookie.value)
+    session_data = interface._retrieve_session_data(store_id) or {}
     session_data["cart"] = cart
     # Set user_id to match current_user.id so before_request does not reset cart.
     session_data["user_id"] = user_id
-    cache.set("session:" + session_id, session_data)
+    interface._upsert_session(
+        flask_app.permanent_session_lifetime, session_data, store_id
+    )
 
 
 def test_checkout_includes_user_id_in_metadata(client, logged_in_user):
     """PaymentIntent metadata must include user_id so the webhook can create orders."""
     mock_intent = MagicMock()
+    mock_intent.id = "pi_test_123"
+    mock_intent.status = "requires_payment_method"
     mock_intent.client_secret = "pi_test_secret_123"
 
     _inject_cart(client, {"2025-04-28": "Test Meal"}, logged_in_user.id)
@@ -34,7 +38,7 @@ def test_checkout_includes_user_id_in_metadata(client, logged_in_user):
     stripe_module.api_key = "sk_test_fake"
 
     with patch.object(app_module, "STRIPE_PUBLIC_KEY", "pk_test_fake"), \
-         patch("app.stripe.PaymentIntent.create", return_value=mock_intent) as mock_create:
+         patch("app.stripe_api.create_payment_intent", return_value=mock_intent) as mock_create:
         client.get("/checkout")
 
         assert mock_create.called, "PaymentIntent.create was not called"
@@ -42,3 +46,23 @@ def test_checkout_includes_user_id_in_metadata(client, logged_in_user):
         metadata = call_kwargs.get("metadata", {})
         assert "user_id" in metadata, "user_id must be in PaymentIntent metadata"
         assert metadata["user_id"] == str(logged_in_user.id)
+
+
+def test_repeat_checkout_reuses_the_payment_intent(client, logged_in_user):
+    mock_intent = MagicMock(id="pi_reused", status="requires_payment_method")
+    mock_intent.client_secret = "pi_reused_secret"
+    _inject_cart(client, {"2025-04-28": "Test Meal"}, logged_in_user.id)
+
+    with patch.object(app_module, "STRIPE_PUBLIC_KEY", "pk_test_fake"), \
+         patch("app.stripe.api_key", "sk_test_fake"), \
+         patch("app.stripe_api") as stripe_api:
+        stripe_api.create_payment_intent.return_value = mock_intent
+        first = client.get("/checkout")
+        second = client.get("/checkout")
+
+    assert stripe_api.create_payment_intent.call_count == 1
+    assert stripe_api.create_payment_intent.call_args.kwargs["idempotency_key"]
+    assert not stripe_api.update_payment_intent.called
+    assert not stripe_api.retrieve_payment_intent.called
+    assert b"pi_reused_secret" in first.data
+    assert b"pi_reused_secret" in second.data
@@ -0,0 +1,74 @@
+from tests.conftest import login
+from tests.test_checkout import _inject_cart
+from tests.test_webhook import _make_event, _post_webhook
+
+
+def _revalidate(client, url):
+    first = client.get(url)
+    assert first.status_code == 200
+    return first, client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+
+
+def test_unchanged_dashboard_is_not_modified(client, test_user, count_queries):
+    login(client)
+    client.get("/dashboard")  # shows the login flash
+    first = client.get("/dashboard")
+
+    with count_queries() as queries:
+        second = client.get(
+            "/dashboard", headers={"If-None-Match": first.headers["ETag"]}
+        )
+
+    assert first.headers["ETag"].startswith('W/"')
+    assert "no-cache" in first.headers["Cache-Control"]
+    assert second.status_code == 304
+    assert second.data == b""
+    # Only the primary-key read of orders_version
+    assert queries.count == 1, queries
+
+
+def test_webhook_orders_change_the_dashboard_etag(client, test_user):
+    login(client)
+    client.get("/dashboard")
+    first = client.get("/dashboard")
+    assert b"pi_test_webhook_123" not in first.data
+
+    # The inbox worker writes the orders outside this user's requests, and
+    # leaves the per-worker user cache as it was
+    _post_webhook(client, _make_event(test_user, {"2025-04-28": "Test Meal"}))
+    second = client.get("/dashboard", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert b"pi_test_webhook_123" in second.data
+
+
+def test_cart_change_changes_the_cart_etag(client, test_user):
+    login(client)
+    client.get("/dashboard")
+    first, second = _revalidate(client, "/cart")
+    assert second.status_code == 304
+
+    _inject_cart(client, {"2025-04-28": "Test Meal"}, test_user)
+    third = client.get("/cart", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert third.status_code == 200
+    assert b"Test Meal" in third.data
+
+
+def test_pending_flash_is_always_rendered(client, test_user):
+    login(client)
+    client.get("/dashboard")
+    first = client.get("/dashboard")
+    client.post("/delete_order")  # flashes "No date specified"
+
+    second = client.get("/dashboard", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 200
+    assert "ETag" not in second.headers
+
+
+def test_js_assets_are_conditional(client):
+    _, second = _revalidate(client, "/js/cart.js")
+
+    assert second.status_code == 304
@@ -3,7 +3,7 @@ from unittest.mock import patch, MagicMock
 
 def test_confirmation_redirects_on_failed_redirect_status(client):
     """redirect_status=failed must redirect to cart without calling Stripe API."""
-    with patch("app.stripe.PaymentIntent.retrieve") as mock_retrieve:
+    with patch("app.stripe_api.retrieve_payment_intent") as mock_retrieve:
         response = client.get(
             "/confirmation?payment_intent=pi_test_123&redirect_status=failed",
             follow_redirects=False,
@@ -15,7 +15,7 @@ def test_confirmation_redirects_on_failed_redirect_status(client):
 
 def test_confirmation_redirects_on_canceled_redirect_status(client):
     """redirect_status=canceled must redirect to cart without calling Stripe API."""
-    with patch("app.stripe.PaymentIntent.retrieve") as mock_retrieve:
+    with patch("app.stripe_api.retrieve_payment_intent") as mock_retrieve:
         response = client.get(
             "/confirmation?payment_intent=pi_test_123&redirect_status=canceled",
             follow_redirects=False,
@@ -29,7 +29,10 @@ def test_confirmation_proceeds_when_no_redirect_status(client):
     """No redirect_status param (e.g. direct navigation) must proceed to retrieve the intent."""
     mock_intent = MagicMock()
     mock_intent.status = "requires_payment_method"
-    with patch("app.stripe.PaymentIntent.retrieve", return_value=mock_intent) as mock_retrieve:
+    mock_intent.amount = 2500
+    mock_intent.currency = "usd"
+    mock_intent.metadata = {}
+    with patch("app.stripe_api.retrieve_payment_intent", return_value=mock_intent) as mock_retrieve:
         response = client.get(
             "/confirmation?payment_intent=pi_test_123",
             follow_redirects=False,
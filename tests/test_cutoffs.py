@@ -0,0 +1,41 @@
+from datetime import datetime, time
+
+import pytz
+
+from cutoffs import CutoffSchedule
+
+DENVER = pytz.timezone("America/Denver")
+CUTOFF = time(hour=10, minute=30)
+
+
+def _utc_ts(*args):
+    return int(datetime(*args, tzinfo=pytz.UTC).timestamp())
+
+
+def test_cutoff_follows_dst_transition():
+    """10:30 Denver is 17:30 UTC before the March DST change and 16:30 after."""
+    schedule = CutoffSchedule(["2026-03-07", "2026-03-09"], DENVER, CUTOFF)
+    assert schedule.cutoff("2026-03-07") == _utc_ts(2026, 3, 7, 17, 30)
+    assert schedule.cutoff("2026-03-09") == _utc_ts(2026, 3, 9, 16, 30)
+
+
+def test_is_closed_at_and_after_cutoff():
+    schedule = CutoffSchedule(["2026-05-19"], DENVER, CUTOFF)
+    cutoff = schedule.cutoff("2026-05-19")
+    assert not schedule.is_closed("2026-05-19", now=cutoff - 1)
+    assert schedule.is_closed("2026-05-19", now=cutoff)
+
+
+def test_open_dates_matches_per_date_check():
+    dates = ["2026-05-18", "2026-05-19", "2026-05-20"]
+    schedule = CutoffSchedule(dates, DENVER, CUTOFF)
+    now = schedule.cutoff("2026-05-19")
+    assert schedule.open_dates(now=now) == {"2026-05-20"}
+    assert schedule.open_dates(now=now) == {
+        d for d in dates if not schedule.is_closed(d, now=now)
+    }
+
+
+def test_dates_off_the_menu_are_computed_on_demand():
+    schedule = CutoffSchedule([], DENVER, CUTOFF)
+    assert schedule.cutoff("2026-05-19") == _utc_ts(2026, 5, 19, 16, 30)
@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from app import app as flask_app
+from database import (
+    ENGINE_PROFILES,
+    get_engine_profile,
+    migrate_db,
+    report_engine_settings,
+)
+from models import db
+
+
+def test_production_profile_pragmas_are_applied():
+    settings = report_engine_settings(flask_app)
+    assert settings["journal_mode"] == "wal"
+    assert settings["busy_timeout"] == ENGINE_PROFILES["production"]["busy_timeout"]
+    assert settings["synchronous"] == 1  # NORMAL
+    assert settings["cache_size"] == ENGINE_PROFILES["production"]["cache_size"]
+
+
+def test_unknown_profile_is_rejected(monkeypatch):
+    monkeypatch.setenv("DB_PROFILE", "turbo")
+    with pytest.raises(ValueError):
+        get_engine_profile()
+
+
+def test_migrate_adds_missing_columns_and_order_triggers(tmp_path):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, "
+            "username VARCHAR(80) NOT NULL UNIQUE, password_hash VARCHAR(120) NOT NULL)"
+        )
+        conn.execute("INSERT INTO users VALUES (1, 'old', 'x')")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(app)
+
+    migrate_db(app)
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT orders_version FROM users").fetchone() == (0,)
+        conn.execute(
+            "INSERT INTO orders (user_id, date, meal_name) VALUES (1, '2025-04-28', 'Soup')"
+        )
+        conn.execute("UPDATE orders SET meal_name = 'Salad'")
+        conn.execute("DELETE FROM orders")
+        assert conn.execute("SELECT orders_version FROM users").fetchone() == (3,)
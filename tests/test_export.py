@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+from datetime import date
+from unittest.mock import patch
+
+import admin
+from app import app as flask_app
+from models import Order, db
+from tests.conftest import MOCK_MENU, login
+
+
+def _seed(test_user):
+    with flask_app.app_context():
+        db.session.add_all(
+            [
+                Order(
+                    user_id=test_user,
+                    date=date(2025, 4, 28),
+                    meal_name="Test Meal",
+                    payment_intent_id="pi_1",
+                ),
+                Order(user_id=test_user, date=date(2024, 9, 16), meal_name="Old Meal"),
+            ]
+        )
+        db.session.commit()
+
+
+def test_admin_streams_csv_with_prices(client, test_user, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "ADMIN_USERNAMES", {"testuser"})
+    _seed(test_user)
+    login(client)
+
+    response = client.get("/admin/export?format=csv")
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [(r["date"], r["restaurant"], r["price_cents"]) for r in rows] == [
+        ("2024-09-16", "", ""),
+        ("2025-04-28", "Test Restaurant", "2500"),
+    ]
+
+
+def test_export_filters_by_restaurant_and_date(client, test_user, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "ADMIN_USERNAMES", {"testuser"})
+    _seed(test_user)
+    login(client)
+
+    by_restaurant = client.get(
+        "/admin/export?format=ndjson&restaurant=Test+Restaurant"
+    ).get_data(as_text=True)
+    by_date = client.get("/admin/export?format=ndjson&end=2025-01-01").get_data(
+        as_text=True
+    )
+
+    assert [json.loads(line)["date"] for line in by_restaurant.splitlines()] == [
+        "2025-04-28"
+    ]
+    assert [json.loads(line)["meal"] for line in by_date.splitlines()] == ["Old Meal"]
+
+
+def test_export_is_admin_only(client, test_user):
+    login(client)
+    assert client.get("/admin/export").status_code == 403
+
+
+def test_cli_export(test_user):
+    _seed(test_user)
+    out = io.StringIO()
+
+    with patch("admin.load_menu", return_value=MOCK_MENU):
+        assert admin.main(["export", "--format", "ndjson"], out=out) == 0
+
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [row["user"] for row in rows] == ["testuser", "testuser"]
+    assert rows[1]["price_cents"] == 2500
@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+from app import app as flask_app, menu_fragment_cache, menu_fragments
+from fragments import FragmentCache, render_menu_fragments
+from menu import Menu
+from tests.conftest import login
+
+OPEN_MENU = Menu(
+    {
+        "2099-01-05": {
+            "restaurant": "Future Deli",
+            "meals": [
+                {"name": "Club", "type": "C", "desc": "Turkey club", "price": 12.5},
+                {"name": "Salad", "type": "V", "desc": "Garden salad", "price": 11},
+            ],
+        }
+    }
+)
+
+
+def test_cache_renders_each_key_once_and_evicts_the_oldest():
+    cache = FragmentCache(maxsize=2)
+    rendered = []
+
+    def render(key):
+        rendered.append(key)
+        return key.upper()
+
+    assert cache.get("a", lambda: render("a")) == "A"
+    assert cache.get("a", lambda: render("a")) == "A"
+    cache.get("b", lambda: render("b"))
+    cache.get("c", lambda: render("c"))
+    cache.get("a", lambda: render("a"))
+
+    assert rendered == ["a", "b", "c", "a"]
+
+
+def test_dashboard_renders_the_menu_once_per_worker(client, test_user):
+    menu_fragment_cache.clear()
+    login(client)
+    with (
+        patch("app.get_menu", return_value=OPEN_MENU),
+        patch("app.render_menu_fragments", wraps=render_menu_fragments) as render,
+    ):
+        first = client.get("/dashboard")
+        second = client.get("/dashboard")
+
+    assert render.call_count == 1
+    assert first.data == second.data
+    assert b'<select name="meal_2099-01-05"' in second.data
+    assert b"$12.50 - Club:</strong> Turkey club" in second.data
+    assert b"<td>Future Deli</td>" in second.data
+
+
+def test_fragments_are_keyed_on_the_open_dates():
+    with flask_app.app_context():
+        open_week = menu_fragments(OPEN_MENU, {"2099-01-05"})
+        closed_week = menu_fragments(OPEN_MENU, set())
+
+    assert "2099-01-05" in open_week.choices
+    assert closed_week.choices == {}
+    assert open_week.headings == closed_week.headings
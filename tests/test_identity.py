@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+from app import app as flask_app
+from identity import UserCache, UserRecord, watch_users
+from models import User, db
+from tests.conftest import login
+
+
+def test_cache_counts_hits_and_misses(test_user):
+    cache = UserCache(maxsize=10, ttl=60)
+    with flask_app.app_context():
+        record = cache.get(test_user)
+        assert isinstance(record, UserRecord)
+        assert record.username == "testuser"
+        assert cache.get(test_user) is record
+        assert cache.get(test_user + 1000) is None
+
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2}
+
+
+def test_entries_expire_and_are_bounded(test_user):
+    cache = UserCache(maxsize=1, ttl=60)
+    with flask_app.app_context():
+        other = User(username="other", password_hash="x")
+        db.session.add(other)
+        db.session.commit()
+
+        cache.get(test_user)
+        cache.get(other.id)
+        assert cache.stats()["size"] == 1
+
+        with patch("identity.time.monotonic", return_value=10**9):
+            cache.get(other.id)
+    assert cache.stats()["misses"] == 3
+
+
+def test_orm_changes_invalidate_the_entry(test_user):
+    cache = UserCache()
+    watch_users(cache)
+    with flask_app.app_context():
+        cache.get(test_user)
+        db.session.get(User, test_user).username = "renamed"
+        db.session.commit()
+
+        assert cache.get(test_user).username == "renamed"
+
+
+def test_dashboard_does_not_query_users_when_cached(client, test_user):
+    login(client)
+    client.get("/dashboard")
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with flask_app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        client.get("/dashboard")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # The ETag reads users.orders_version by key; the user itself is cached
+    assert not [s for s in statements if "users.username" in s]
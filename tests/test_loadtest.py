@@ -0,0 +1,55 @@
+import json
+import os
+
+import stripe
+
+from loadtest.harness import app_env, percentile
+from loadtest.stripe_stub import StripeStub, sign_payload, succeeded_event
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.95) == 7
+    assert percentile([], 0.5) is None
+
+
+def test_stub_serves_the_stripe_client():
+    stub = StripeStub().start()
+    client = stripe.StripeClient("sk_test_stub", base_addresses={"api": stub.url})
+    try:
+        intent = client.v1.payment_intents.create(
+            params={"amount": 2500, "currency": "usd", "metadata": {"user_id": "1"}}
+        )
+        assert intent.status == "requires_payment_method"
+        assert intent.client_secret.startswith(f"{intent.id}_secret_")
+
+        retrieved = client.v1.payment_intents.retrieve(intent.id)
+        assert retrieved.status == "succeeded"
+        assert retrieved.metadata["user_id"] == "1"
+    finally:
+        stub.stop()
+
+
+def test_signed_events_verify():
+    event = succeeded_event({"id": "pi_1", "object": "payment_intent"})
+    payload = json.dumps(event).encode("utf-8")
+
+    verified = stripe.Webhook.construct_event(
+        payload, sign_payload(payload, "whsec_test"), "whsec_test"
+    )
+
+    assert verified["data"]["object"]["status"] == "succeeded"
+
+
+def test_app_keeps_its_metrics_in_the_data_dir(tmp_path):
+    stub = StripeStub().start()
+    try:
+        env = app_env(str(tmp_path), stub, threads=2)
+    finally:
+        stub.stop()
+
+    metrics_dir = env["PROMETHEUS_MULTIPROC_DIR"]
+    assert os.path.dirname(metrics_dir) == str(tmp_path)
+    assert env["DATA_DIR"] == str(tmp_path)
@@ -0,0 +1,49 @@
+import json
+import os
+
+from menu import Menu, MenuCatalog
+from tests.conftest import MOCK_LUNCH_OPTIONS
+
+
+def _write_menu(path, options):
+    with open(path, "w") as f:
+        json.dump({"daily_options": options}, f)
+
+
+def test_menu_indexes_meals_and_restaurants():
+    menu = Menu(MOCK_LUNCH_OPTIONS)
+    assert menu.dates == ["2025-04-28"]
+    assert menu.restaurants["2025-04-28"] == "Test Restaurant"
+    assert menu.meal("2025-04-28", "Test Meal")["price"] == 25.00
+    assert not menu.has_meal("2025-04-28", "Missing Meal")
+    assert not menu.has_meal("2025-04-29", "Test Meal")
+
+
+def test_catalog_parses_once_until_file_changes(tmp_path):
+    path = tmp_path / "lunch_options.json"
+    _write_menu(path, MOCK_LUNCH_OPTIONS)
+    catalog = MenuCatalog(str(path), check_interval=0)
+
+    first = catalog.get()
+    assert catalog.get() is first, "unchanged file must not be re-parsed"
+
+    changed = {"2025-04-29": MOCK_LUNCH_OPTIONS["2025-04-28"]}
+    _write_menu(path, changed)
+    # Force a distinct mtime even on filesystems with coarse timestamps.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    reloaded = catalog.get()
+    assert reloaded is not first
+    assert reloaded.dates == ["2025-04-29"]
+    assert reloaded.version != first.version
+
+
+def test_catalog_skips_stat_within_check_interval(tmp_path):
+    path = tmp_path / "lunch_options.json"
+    _write_menu(path, MOCK_LUNCH_OPTIONS)
+    catalog = MenuCatalog(str(path), check_interval=3600)
+
+    first = catalog.get()
+    os.remove(path)
+    assert catalog.get() is first
@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+import stripe
+from prometheus_client import REGISTRY
+
+from app import app as flask_app
+from tests.conftest import login
+from tests.test_checkout import _inject_cart
+
+
+def _value(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+
+def test_requests_are_timed_per_endpoint(client, test_user):
+    login(client)
+    timed = (
+        "lunch_request_duration_seconds_count",
+        {"endpoint": "dashboard", "method": "GET"},
+    )
+    queries = ("lunch_db_queries_per_request_sum", {"endpoint": "dashboard"})
+    timed_before, queries_before = _value(*timed), _value(*queries)
+
+    client.get("/dashboard")
+
+    assert _value(*timed) == timed_before + 1
+    assert _value(*queries) > queries_before
+    assert _value("lunch_requests_in_flight") == 0
+
+
+def test_stripe_errors_are_counted_by_operation(client, logged_in_user):
+    _inject_cart(client, {"2025-04-28": "Test Meal"}, logged_in_user.id)
+    labels = {"operation": "payment_intent.create", "error": "APIConnectionError"}
+    before = _value("lunch_stripe_errors_total", labels)
+
+    with (
+        patch("app.STRIPE_PUBLIC_KEY", "pk_test"),
+        patch("app.stripe.api_key", "sk_test"),
+        patch("app.stripe_api.client") as stripe_client,
+    ):
+        stripe_client.return_value.v1.payment_intents.create.side_effect = (
+            stripe.APIConnectionError("down")
+        )
+        client.get("/checkout")
+
+    assert _value("lunch_stripe_errors_total", labels) == before + 1
+
+
+def test_metrics_endpoint_exposes_text_format(client, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "METRICS_TOKEN", "scrape-token")
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert b"lunch_request_duration_seconds_bucket" in response.data
+
+
+def test_metrics_endpoint_requires_the_token(client, monkeypatch):
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setitem(flask_app.config, "METRICS_TOKEN", "scrape-token")
+    missing = client.get("/metrics")
+    wrong = client.get("/metrics", headers={"Authorization": "Bearer guess"})
+
+    assert missing.status_code == wrong.status_code == 401
+    assert missing.headers["WWW-Authenticate"] == "Bearer"
+    assert b"lunch_" not in missing.data + wrong.data
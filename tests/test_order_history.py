@@ -0,0 +1,61 @@
+from datetime import date
+
+from app import app as flask_app
+from models import Order, db
+from orders import confirmations_page, orders_by_date, parse_cursor
+
+
+def _add_orders(user_id, rows):
+    db.session.add_all(
+        Order(user_id=user_id, date=d, meal_name=meal, payment_intent_id=pid)
+        for d, meal, pid in rows
+    )
+    db.session.commit()
+
+
+def test_confirmations_are_grouped_and_paged(test_user):
+    with flask_app.app_context():
+        _add_orders(
+            test_user,
+            [
+                (date(2024, 9, 16), "Soup", "pi_a"),
+                (date(2024, 9, 17), "Salad", "pi_a"),
+                (date(2025, 4, 28), "Salad", "pi_b"),
+                (date(2025, 4, 30), "Burrito", "pi_b"),
+                (date(2025, 4, 29), "Soup", "pi_c"),
+                (date(2025, 5, 1), "Soup", None),  # unpaid orders are not receipts
+            ],
+        )
+
+        page, cursor = confirmations_page(test_user, limit=2)
+        assert [c.payment_intent_id for c in page] == ["pi_b", "pi_c"]
+        assert page[0].dates == ["2025-04-30", "2025-04-28"]
+        assert page[0].meals == ["Burrito", "Salad"]
+        assert cursor == "2025-04-29:pi_c"
+
+        page, cursor = confirmations_page(test_user, 2, parse_cursor(cursor))
+        assert [c.payment_intent_id for c in page] == ["pi_a"]
+        assert page[0].dates == ["2024-09-17", "2024-09-16"]
+        assert cursor is None
+
+
+def test_parse_cursor_rejects_malformed_values():
+    assert parse_cursor(None) is None
+    assert parse_cursor("garbage") is None
+    assert parse_cursor("2025-04-29:") is None
+    assert parse_cursor("2025-04-29:pi_c") == (date(2025, 4, 29), "pi_c")
+
+
+def test_orders_by_date_is_limited_to_the_menu_range(test_user):
+    with flask_app.app_context():
+        _add_orders(
+            test_user,
+            [
+                (date(2024, 9, 16), "Soup", "pi_a"),
+                (date(2025, 4, 28), "Burrito", None),
+            ],
+        )
+        assert orders_by_date(test_user, ["2025-04-28", "2025-04-29"]) == {
+            "2025-04-28": "Burrito"
+        }
+        assert orders_by_date(test_user, []) == {}
@@ -0,0 +1,59 @@
+from datetime import date
+
+from sqlalchemy import event
+
+from app import app as flask_app
+from models import Order, db
+from orders import save_orders
+
+
+def _meals(user_id):
+    return {
+        o.date.strftime("%Y-%m-%d"): o.meal_name
+        for o in Order.query.filter_by(user_id=user_id).all()
+    }
+
+
+def test_save_orders_reports_inserted_updated_and_unchanged(test_user):
+    with flask_app.app_context():
+        db.session.add_all(
+            [
+                Order(user_id=test_user, date=date(2026, 5, 18), meal_name="Salad"),
+                Order(user_id=test_user, date=date(2026, 5, 19), meal_name="Salad"),
+            ]
+        )
+        db.session.commit()
+
+        result = save_orders(
+            test_user,
+            {"2026-05-18": "Salad", "2026-05-19": "Burrito", "2026-05-20": "Soup"},
+        )
+        db.session.commit()
+
+        assert result.inserted == ["2026-05-20"]
+        assert result.updated == ["2026-05-19"]
+        assert result.unchanged == ["2026-05-18"]
+        assert _meals(test_user) == {
+            "2026-05-18": "Salad",
+            "2026-05-19": "Burrito",
+            "2026-05-20": "Soup",
+        }
+
+
+def test_save_orders_issues_no_selects(test_user):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with flask_app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            save_orders(test_user, {"2026-05-18": "Salad", "2026-05-19": "Soup"})
+            save_orders(test_user, {"2026-05-18": "Soup", "2026-05-19": "Soup"})
+            db.session.commit()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+    assert statements
+    assert not [s for s in statements if s.lstrip().upper().startswith("SELECT")]
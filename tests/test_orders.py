@@ -32,6 +32,8 @@ def make_mock_intent(cart=None, status="succeeded"):
         cart = TEST_CART
     intent = MagicMock()
     intent.status = status
+    intent.amount = 2500
+    intent.currency = "usd"
     intent.metadata = {"cart": json.dumps(cart)}
     return intent
 
@@ -49,7 +51,7 @@ class TestIdempotentConfirmation:
         with client:
             login(client)
 
-            with patch("app.stripe.PaymentIntent.retrieve", return_value=mock_intent):
+            with patch("app.stripe_api.retrieve_payment_intent", return_value=mock_intent):
                 resp1 = client.get("/confirmation?payment_intent=pi_test_reload")
                 assert resp1.status_code == 200
 
@@ -125,7 +127,7 @@ class TestPendingPaymentRedirect:
 
         with client:
             # Visit /confirmation while not logged in — stores pending intent in session.
-            with patch("app.stripe.PaymentIntent.retrieve", return_value=mock_intent):
+            with patch("app.stripe_api.retrieve_payment_intent", return_value=mock_intent):
                 resp = client.get(
                     "/confirmation?payment_intent=pi_test_pending",
                     follow_redirects=False,
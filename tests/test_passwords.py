@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from app import app as flask_app
+from models import User, db
+from passwords import HasherBusy, PasswordHasher
+from tests.conftest import login
+
+
+def test_pool_hashes_and_verifies():
+    hasher = PasswordHasher("pbkdf2:sha256:1000", workers=1)
+    try:
+        password_hash = hasher.hash("secret")
+        assert password_hash.startswith("pbkdf2:sha256:1000$")
+        assert hasher.verify(password_hash, "secret")
+        assert not hasher.verify(password_hash, "wrong")
+    finally:
+        hasher.shutdown()
+
+
+def test_full_queue_fails_fast():
+    hasher = PasswordHasher(workers=0, max_pending=1)
+    hasher._slots.acquire()
+    with pytest.raises(HasherBusy):
+        hasher.hash("secret")
+
+
+def test_timed_out_job_keeps_its_slot_until_it_finishes():
+    hasher = PasswordHasher(workers=1, max_pending=1, timeout=0.1)
+    try:
+        with pytest.raises(HasherBusy, match="timed out"):
+            hasher._run(time.sleep, 1)
+        # The sleep is still running in the pool, so the queue is still full
+        with pytest.raises(HasherBusy, match="full"):
+            hasher.hash("secret")
+
+        assert hasher._slots.acquire(timeout=10)
+    finally:
+        hasher.shutdown()
+
+
+def test_needs_rehash_compares_method_and_cost():
+    hasher = PasswordHasher("scrypt:32768:8:1", workers=0)
+    assert not hasher.needs_rehash("scrypt:32768:8:1$salt$hash")
+    assert hasher.needs_rehash("scrypt:16384:8:1$salt$hash")
+    assert hasher.needs_rehash("pbkdf2:sha256:600000$salt$hash")
+
+
+def test_login_upgrades_hash_when_cost_changes(client, test_user, monkeypatch):
+    monkeypatch.setattr(app_module.password_hasher, "method", "pbkdf2:sha256:1000")
+
+    response = login(client)
+
+    assert response.status_code == 302
+    with flask_app.app_context():
+        password_hash = db.session.get(User, test_user).password_hash
+    assert password_hash.startswith("pbkdf2:sha256:1000$")
+    # The upgraded hash still logs in
+    client.get("/logout")
+    assert login(client).status_code == 302
+
+
+def test_login_returns_503_when_hashing_is_saturated(client, test_user, monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(app_module.password_hasher, "_slots", slots)
+
+    response = login(client)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
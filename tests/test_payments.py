@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from app import app as flask_app, stripe_api
+from models import Payment, db
+from payments import SingleFlight, checkout_intent, get_payment, record_intent
+
+
+def _intent(status="succeeded"):
+    intent = MagicMock()
+    intent.status = status
+    intent.amount = 2500
+    intent.currency = "usd"
+    intent.metadata = {"cart": json.dumps({"2025-04-28": "Test Meal"})}
+    return intent
+
+
+def test_final_payment_is_served_from_the_ledger(test_user):
+    with flask_app.app_context():
+        with patch(
+            "app.stripe_api.retrieve_payment_intent", return_value=_intent()
+        ) as retrieve:
+            first = get_payment("pi_ledger", stripe_api)
+            second = get_payment("pi_ledger", stripe_api)
+
+        assert retrieve.call_count == 1
+        assert first.status == second.status == "succeeded"
+        assert second.amount == 2500
+
+
+def test_pending_payment_is_refreshed_from_stripe(test_user):
+    with flask_app.app_context():
+        record_intent("pi_pending", "processing", 2500, "usd", {})
+        db.session.commit()
+
+        with patch("app.stripe_api.retrieve_payment_intent", return_value=_intent()):
+            payment = get_payment("pi_pending", stripe_api)
+
+        assert payment.status == "succeeded"
+
+
+def test_final_status_is_never_downgraded(test_user):
+    with flask_app.app_context():
+        record_intent("pi_final", "succeeded", 2500, "usd", {})
+        record_intent("pi_final", "processing", 2500, "usd", {})
+        db.session.commit()
+        assert db.session.get(Payment, "pi_final").status == "succeeded"
+
+
+def test_single_flight_shares_one_call_between_threads():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow_fetch():
+        calls.append(1)
+        release.wait(5)
+        return "intent"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("pi", slow_fetch)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["intent"] * 5
+
+
+def _payable_intent(intent_id):
+    intent = MagicMock(id=intent_id, status="requires_payment_method")
+    intent.client_secret = f"{intent_id}_secret"
+    return intent
+
+
+def test_checkout_intent_updates_when_the_cart_changes(test_user):
+    api = MagicMock()
+    api.create_payment_intent.return_value = _payable_intent("pi_cart")
+    api.update_payment_intent.return_value = _payable_intent("pi_cart")
+    with flask_app.app_context():
+        saved = checkout_intent(api, test_user, {"2025-04-28": "Soup"}, 1500)
+        updated = checkout_intent(
+            api, test_user, {"2025-04-28": "Test Meal"}, 2500, saved=saved
+        )
+        db.session.commit()
+        payment = db.session.get(Payment, "pi_cart")
+
+    assert api.create_payment_intent.call_count == 1
+    assert api.update_payment_intent.call_args.kwargs["amount"] == 2500
+    assert updated["id"] == "pi_cart" and updated["key"] != saved["key"]
+    assert payment.amount == 2500
+
+
+def test_checkout_intent_replaces_a_paid_intent(test_user):
+    created = {}
+
+    def create_payment_intent(idempotency_key, **params):
+        # Like Stripe, replay the intent as it was when the key first created it
+        if idempotency_key not in created:
+            created[idempotency_key] = _payable_intent(f"pi_{len(created)}")
+        return created[idempotency_key]
+
+    api = MagicMock()
+    api.create_payment_intent.side_effect = create_payment_intent
+    cart = {"2025-04-28": "Test Meal"}
+    with flask_app.app_context():
+        first = checkout_intent(api, test_user, cart, 2500)
+        # Paid: the confirmation page and webhook record it in the ledger, and
+        # both drop the session's checkout_intent
+        record_intent(first["id"], "succeeded", 2500, "usd", {})
+        db.session.commit()
+
+        second = checkout_intent(api, test_user, cart, 2500)
+        record_intent(second["id"], "succeeded", 2500, "usd", {})
+        db.session.commit()
+
+        third = checkout_intent(api, test_user, cart, 2500)
+
+    assert first["id"] == "pi_0"
+    assert second["id"] == "pi_1"
+    assert third["id"] == "pi_2"
+    assert third["client_secret"] == "pi_2_secret"
+
+
+def test_checkout_intent_skips_a_replayed_intent_updated_for_another_cart(
+    test_user,
+):
+    created = {}
+
+    def create_payment_intent(idempotency_key, **params):
+        if idempotency_key not in created:
+            created[idempotency_key] = _payable_intent(f"pi_{len(created)}")
+        return created[idempotency_key]
+
+    api = MagicMock()
+    api.create_payment_intent.side_effect = create_payment_intent
+    api.update_payment_intent.side_effect = lambda intent_id, **params: _payable_intent(
+        intent_id
+    )
+    cart_a, cart_b = {"2025-04-28": "Test Meal"}, {"2025-04-28": "Soup"}
+    with flask_app.app_context():
+        saved = checkout_intent(api, test_user, cart_a, 2500)
+        # The same session changes its cart: the intent now charges cart B
+        checkout_intent(api, test_user, cart_b, 1500, saved=saved)
+        db.session.commit()
+
+        # A fresh session checks out cart A again and replays A's first key
+        again = checkout_intent(api, test_user, cart_a, 2500)
+        db.session.commit()
+        updated = db.session.get(Payment, "pi_0")
+
+    assert again["id"] == "pi_1"
+    assert (updated.amount, json.loads(updated.cart)) == (1500, cart_b)
+
+
+def test_checkout_intent_reuses_the_replayed_intent_while_unpaid(test_user):
+    api = MagicMock()
+    api.create_payment_intent.return_value = _payable_intent("pi_unpaid")
+    cart = {"2025-04-28": "Test Meal"}
+    with flask_app.app_context():
+        first = checkout_intent(api, test_user, cart, 2500)
+        db.session.commit()
+        second = checkout_intent(api, test_user, cart, 2500)
+
+    assert first["id"] == second["id"] == "pi_unpaid"
+    assert api.create_payment_intent.call_count == 2
+
+
+def test_checkout_intent_sends_the_same_params_for_a_reordered_cart(test_user):
+    api = MagicMock()
+    api.create_payment_intent.return_value = _payable_intent("pi_order")
+    with flask_app.app_context():
+        checkout_intent(
+            api, test_user, {"2025-04-29": "Soup", "2025-04-28": "Test Meal"}, 4000
+        )
+        checkout_intent(
+            api, test_user, {"2025-04-28": "Test Meal", "2025-04-29": "Soup"}, 4000
+        )
+
+    first, second = api.create_payment_intent.call_args_list
+    # Stripe rejects a reused idempotency key sent with different params
+    assert first.kwargs["idempotency_key"] == second.kwargs["idempotency_key"]
+    assert first.kwargs == second.kwargs
@@ -0,0 +1,42 @@
+from pricing import PriceBook, format_cents, to_cents
+
+OPTIONS = {
+    "2026-05-18": {
+        "restaurant": "A",
+        "meals": [
+            {"name": "Salad", "type": "V", "desc": "", "price": 16.1},
+            {"name": "Burrito", "type": "C", "desc": "", "price": 19.99},
+        ],
+    },
+    "2026-05-19": {
+        "restaurant": "B",
+        "meals": [{"name": "Salad", "type": "V", "desc": "", "price": 14.3}],
+    },
+}
+
+
+def test_to_cents_has_no_float_drift():
+    assert to_cents(16.1) == 1610
+    assert to_cents(19.99) == 1999
+    assert to_cents(0.29) == 29
+    assert to_cents("14.30") == 1430
+
+
+def test_format_cents():
+    assert format_cents(0) == "0.00"
+    assert format_cents(1605) == "16.05"
+
+
+def test_price_cart_returns_lines_and_total():
+    pricing = PriceBook(OPTIONS).price_cart(
+        {"2026-05-18": "Burrito", "2026-05-19": "Salad"}
+    )
+    assert [line.price_cents for line in pricing.lines] == [1999, 1430]
+    assert pricing.prices == {"2026-05-18": 1999, "2026-05-19": 1430}
+    assert pricing.total_cents == 3429
+
+
+def test_unknown_meal_is_priced_at_zero():
+    book = PriceBook(OPTIONS)
+    assert book.price("2026-05-19", "Burrito") == 0
+    assert book.price_cart({"2026-05-20": "Salad"}).total_cents == 0
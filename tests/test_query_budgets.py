@@ -0,0 +1,228 @@
+"""
+Query budgets per route.
+
+Each route is driven against a short and a long order history and must stay
+within the number of queries checked in to query_budgets.json.  A route that
+starts issuing a query per row (an N+1) blows its budget on the long history;
+routes that write a cart, and the inbox drain, are also checked against carts
+of different sizes and batches of different lengths.
+Raise a budget only together with the change that needs it.
+"""
+
+import json
+import os
+from datetime import date, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app import app as flask_app
+from models import Order, Payment, db
+from payments import record_intent
+from tests.conftest import login
+from tests.test_checkout import _inject_cart
+from webhooks import drain_inbox
+
+with open(os.path.join(os.path.dirname(__file__), "query_budgets.json")) as f:
+    BUDGETS = json.load(f)
+
+HISTORY_SIZES = [1, 40]
+CART_SIZES = [1, 5]
+
+
+def _cart(size, first=date(2025, 4, 28)):
+    """A cart of ``size`` consecutive dates from ``first``"""
+    return {
+        (first + timedelta(days=day)).isoformat(): "Test Meal" for day in range(size)
+    }
+
+
+def _history(user_id, receipts, start=0):
+    """Paid orders for ``receipts`` past payments, three days each"""
+    with flask_app.app_context():
+        first = date(2024, 1, 1)
+        for i in range(start, start + receipts):
+            pid = f"pi_history_{i}"
+            for day in range(3):
+                db.session.add(
+                    Order(
+                        user_id=user_id,
+                        date=first + timedelta(days=i * 3 + day),
+                        meal_name="Test Meal",
+                        payment_intent_id=pid,
+                    )
+                )
+            record_intent(pid, "succeeded", 7500, "usd", {"user_id": str(user_id)})
+        db.session.commit()
+
+
+def _succeeded_intent(pid, user_id, cart):
+    intent = MagicMock()
+    intent.id = pid
+    intent.status = "succeeded"
+    intent.amount = 2500 * len(cart)
+    intent.currency = "usd"
+    intent.metadata = {"user_id": str(user_id), "cart": json.dumps(cart)}
+    return intent
+
+
+def _webhook_event(pid, user_id, cart=None):
+    return {
+        "id": f"evt_{pid}",
+        "type": "payment_intent.succeeded",
+        "data": {
+            "object": {
+                "id": pid,
+                "status": "succeeded",
+                "amount": 2500 * len(cart or _cart(1)),
+                "currency": "usd",
+                "metadata": {
+                    "user_id": str(user_id),
+                    "cart": json.dumps(cart or _cart(1)),
+                },
+            }
+        },
+    }
+
+
+def _post_webhook(client, user_id, cart=None, pid="pi_budget_webhook"):
+    event = _webhook_event(pid, user_id, cart)
+    with patch("app.stripe.Webhook.construct_event", return_value=event):
+        return client.post(
+            "/webhook", data=json.dumps(event), headers={"Stripe-Signature": "t=1"}
+        )
+
+
+def _checkout(client, user_id, cart=None):
+    _inject_cart(client, cart or _cart(1), user_id)
+    intent = MagicMock(id="pi_budget_checkout", status="requires_payment_method")
+    intent.client_secret = "pi_budget_checkout_secret"
+    with (
+        patch("app.STRIPE_PUBLIC_KEY", "pk_test"),
+        patch("app.stripe.api_key", "sk_test"),
+        patch("app.stripe_api.create_payment_intent", return_value=intent),
+    ):
+        return client.get("/checkout")
+
+
+def _confirmation(client, user_id, cart=None):
+    intent = _succeeded_intent("pi_budget_confirm", user_id, cart or _cart(1))
+    with patch("app.stripe_api.retrieve_payment_intent", return_value=intent):
+        return client.get("/confirmation?payment_intent=pi_budget_confirm")
+
+
+ROUTES = {
+    "GET /dashboard": lambda client, user_id: client.get("/dashboard"),
+    "GET /cart": lambda client, user_id: client.get("/cart"),
+    "POST /order": lambda client, user_id: client.post(
+        "/order", data={"meal_2025-04-28": "Test Meal", "meal_2025-04-29": "Soup"}
+    ),
+    "POST /delete_order": lambda client, user_id: client.post(
+        "/delete_order", data={"date": "2024-01-01"}
+    ),
+    "GET /checkout": _checkout,
+    "GET /confirmation": _confirmation,
+    "GET /print-confirmation": lambda client, user_id: client.get(
+        "/print-confirmation/pi_history_0"
+    ),
+    "POST /webhook": _post_webhook,
+}
+
+
+@pytest.mark.parametrize("size", HISTORY_SIZES)
+@pytest.mark.parametrize("route", sorted(ROUTES))
+def test_route_stays_within_budget(client, test_user, count_queries, route, size):
+    _history(test_user, size)
+    login(client)
+    client.get("/dashboard")  # warm the user cache like any later page view
+
+    with count_queries() as queries:
+        response = ROUTES[route](client, test_user)
+
+    assert response.status_code < 500
+    assert queries.count <= BUDGETS[route], queries
+
+
+def test_dashboard_queries_do_not_grow_with_history(client, test_user, count_queries):
+    login(client)
+    client.get("/dashboard")
+    counts = []
+    for start, receipts in [(0, 1), (1, 39)]:
+        _history(test_user, receipts, start)
+        with count_queries() as queries:
+            client.get("/dashboard")
+        counts.append(queries.count)
+
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.parametrize("route", ["GET /checkout", "GET /confirmation"])
+def test_cart_routes_do_not_grow_with_cart_size(test_user, count_queries, route):
+    counts = []
+    for size in CART_SIZES:
+        with flask_app.app_context():
+            Order.query.delete()
+            Payment.query.delete()
+            db.session.commit()
+        client = flask_app.test_client()
+        login(client)
+        client.get("/dashboard")
+        with count_queries() as queries:
+            response = ROUTES[route](client, test_user, _cart(size))
+        assert response.status_code < 500
+        counts.append(queries)
+
+    assert counts[0].count == counts[1].count, counts
+
+
+def _drain_queries(count_queries):
+    with flask_app.app_context(), count_queries() as queries:
+        drain_inbox()
+    return queries.count
+
+
+def test_inbox_drain_does_not_grow_with_cart_size(client, test_user, count_queries):
+    counts = []
+    for size, first in zip(CART_SIZES, [date(2025, 5, 1), date(2025, 6, 1)]):
+        _post_webhook(client, test_user, _cart(size, first), f"pi_budget_{size}")
+        counts.append(_drain_queries(count_queries))
+
+    assert counts[0] == counts[1]
+    with flask_app.app_context():
+        assert Order.query.count() == sum(CART_SIZES)
+
+
+def test_inbox_drain_does_not_grow_per_event(client, test_user, count_queries):
+    # Each event commits on its own, so one bad event cannot roll back the
+    # others; only the claim is shared, and each event must cost the same
+    counts = []
+    for events, month in [(1, 5), (10, 6)]:
+        for i in range(events):
+            cart = _cart(1, date(2025, month, i + 1))
+            _post_webhook(client, test_user, cart, f"pi_budget_{month}_{i}")
+        counts.append(_drain_queries(count_queries))
+
+    claim = 1
+    assert counts[1] - claim == 10 * (counts[0] - claim), counts
+    with flask_app.app_context():
+        assert Order.query.count() == 11
+
+
+def test_inbox_drain_stays_within_budget(client, test_user, count_queries):
+    _post_webhook(client, test_user)
+
+    with flask_app.app_context(), count_queries() as queries:
+        drain_inbox()
+
+    assert queries.count <= BUDGETS["drain_inbox (1 event)"], queries
+
+
+def test_debug_header_reports_query_count(client, test_user, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "QUERY_COUNT_HEADER", True)
+    login(client)
+    client.get("/dashboard")
+
+    response = client.get("/dashboard")
+
+    assert response.headers["X-Query-Count"] == str(BUDGETS["GET /dashboard"])
+    assert "X-Query-Time-Ms" in response.headers
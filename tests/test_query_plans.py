@@ -0,0 +1,257 @@
+"""
+Query plan audit.
+
+Every endpoint, the webhook inbox drain and the session store are driven once,
+and every statement they issue is replayed through EXPLAIN QUERY PLAN.  A plan
+that scans a whole table that grows with use means a lookup is missing an
+index and will slow down as rows accumulate.  The test fails if an endpoint is
+added without being driven here.
+"""
+
+import json
+from contextlib import contextmanager
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import event
+
+from app import app as flask_app
+from menu import Menu
+from models import Order, db
+from payments import record_intent
+from tests.conftest import login
+from webhooks import drain_inbox
+
+# Tables that grow with use; a full scan of any of them is a missing index
+GROWING_TABLES = ("orders", "payments", "users", "webhook_events", "sessions")
+
+# Endpoints that never touch either database
+NO_QUERY_ENDPOINTS = {"static", "serve_js", "prometheus_metrics"}
+
+MEAL = {"name": "Test Meal", "type": "C", "desc": "A test meal", "price": 25.00}
+# Past dates, and one still open for ordering so the cart routes write
+AUDIT_MENU = Menu(
+    {
+        day: {"restaurant": "Test Restaurant", "meals": [MEAL]}
+        for day in ("2025-04-28", "2025-04-29", "2025-04-30", "2099-01-05")
+    }
+)
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    with flask_app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+@contextmanager
+def captured_session_statements():
+    """Statements the session store runs on this thread's sqlite3 connection"""
+    statements = []
+    conn = flask_app.session_interface.store._connect()
+    conn.set_trace_callback(statements.append)
+    try:
+        yield statements
+    finally:
+        conn.set_trace_callback(None)
+
+
+def _scans(plan_rows):
+    return [
+        row[-1]
+        for row in plan_rows
+        if any(row[-1].startswith(f"SCAN {table}") for table in GROWING_TABLES)
+    ]
+
+
+def full_scans(statements):
+    scans = []
+    with flask_app.app_context():
+        with db.engine.connect() as conn:
+            for statement, parameters in statements:
+                if not _explainable(statement):
+                    continue
+                plan = conn.exec_driver_sql(
+                    "EXPLAIN QUERY PLAN " + statement, parameters
+                ).fetchall()
+                scans.extend((statement, detail) for detail in _scans(plan))
+    return scans
+
+
+def full_session_scans(statements):
+    conn = flask_app.session_interface.store._connect()
+    scans = []
+    for statement in statements:
+        if not _explainable(statement):
+            continue
+        plan = conn.execute("EXPLAIN QUERY PLAN " + statement).fetchall()
+        scans.extend((statement, detail) for detail in _scans(plan))
+    return scans
+
+
+def _explainable(statement):
+    verb = statement.lstrip().split(None, 1)[0].upper()
+    return verb in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def _intent(pid, cart, status="succeeded"):
+    intent = MagicMock()
+    intent.id = pid
+    intent.status = status
+    intent.amount = 2500
+    intent.currency = "usd"
+    intent.client_secret = f"{pid}_secret"
+    intent.metadata = {"cart": json.dumps(cart)}
+    return intent
+
+
+def _webhook(client, user_id):
+    event_dict = {
+        "id": "evt_audit",
+        "type": "payment_intent.succeeded",
+        "data": {
+            "object": {
+                "id": "pi_audit_webhook",
+                "metadata": {
+                    "user_id": str(user_id),
+                    "cart": json.dumps({"2025-04-30": "Test Meal"}),
+                },
+            }
+        },
+    }
+    with patch("app.stripe.Webhook.construct_event", return_value=event_dict):
+        client.post(
+            "/webhook",
+            data=json.dumps(event_dict).encode(),
+            headers={"Stripe-Signature": "t=1"},
+        )
+
+
+def _checkout(client, user_id):
+    client.post("/add_to_cart", data={"meal_2099-01-05": "Test Meal"})
+    with (
+        patch("app.STRIPE_PUBLIC_KEY", "pk_test"),
+        patch("app.stripe.api_key", "sk_test"),
+        patch(
+            "app.stripe_api.create_payment_intent",
+            return_value=_intent("pi_audit_checkout", {}, "requires_payment_method"),
+        ),
+    ):
+        client.get("/checkout")
+
+
+def _confirmation(client, user_id):
+    intent = _intent("pi_audit_confirm", {"2025-04-29": "Test Meal"})
+    with patch("app.stripe_api.retrieve_payment_intent", return_value=intent):
+        client.get("/confirmation?payment_intent=pi_audit_confirm")
+
+
+# Endpoint -> how to drive it as the logged-in test user
+ENDPOINTS = {
+    "index": lambda client, user_id: client.get("/"),
+    # As a visitor: logged-in users are redirected
+    "register": lambda client, user_id: flask_app.test_client().post(
+        "/register", data={"username": "audit", "password": "auditpass"}
+    ),
+    "dashboard": lambda client, user_id: client.get("/dashboard?page=2"),
+    "order": lambda client, user_id: client.post(
+        "/order", data={"meal_2025-04-28": "Test Meal"}
+    ),
+    "add_to_cart": lambda client, user_id: client.post(
+        "/add_to_cart", data={"meal_2099-01-05": "Test Meal"}
+    ),
+    "remove_from_cart": lambda client, user_id: client.post(
+        "/remove_from_cart", json={"date": "2099-01-05"}
+    ),
+    "cart": lambda client, user_id: client.get("/cart"),
+    "submit_cart": lambda client, user_id: (
+        client.post("/add_to_cart", data={"meal_2099-01-05": "Test Meal"}),
+        client.post("/submit_cart"),
+    )[-1],
+    "clear_cart": lambda client, user_id: client.post("/clear_cart"),
+    "checkout": _checkout,
+    "confirmation": _confirmation,
+    "print_confirmation": lambda client, user_id: client.get(
+        "/print-confirmation/pi_audit"
+    ),
+    "webhook": _webhook,
+    # Buffered: an unread streamed response keeps its app context pushed
+    "export_orders": lambda client, user_id: client.get(
+        "/admin/export?format=csv&start=2025-04-28&end=2025-04-30", buffered=True
+    ),
+    "api_menu": lambda client, user_id: client.get("/api/v1/menu"),
+    "api_dates": lambda client, user_id: client.get("/api/v1/dates"),
+    "api_orders": lambda client, user_id: client.get(
+        "/api/v1/me/orders?start=2025-04-28&cursor=2025-04-28"
+    ),
+    "api_confirmations": lambda client, user_id: client.get(
+        "/api/v1/me/confirmations?cursor=2025-04-30:pi_audit"
+    ),
+    "delete_order": lambda client, user_id: client.post(
+        "/delete_order", data={"date": "2025-04-28"}
+    ),
+    "logout": lambda client, user_id: client.get("/logout"),
+    "login": lambda client, user_id: login(client),
+}
+
+
+def test_every_endpoint_is_audited():
+    endpoints = {rule.endpoint for rule in flask_app.url_map.iter_rules()}
+
+    assert endpoints - NO_QUERY_ENDPOINTS == set(ENDPOINTS)
+
+
+@pytest.fixture
+def audited_client(client, test_user, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "ADMIN_USERNAMES", {"testuser"})
+    monkeypatch.setattr("app.get_menu", lambda: AUDIT_MENU)
+    with flask_app.app_context():
+        record_intent("pi_audit", "succeeded", 2500, "usd", {"user_id": str(test_user)})
+        db.session.add(
+            Order(
+                user_id=test_user,
+                date=date(2025, 4, 28),
+                meal_name="Test Meal",
+                payment_intent_id="pi_audit",
+            )
+        )
+        db.session.commit()
+    with client:
+        login(client)
+        yield client
+
+
+def test_app_queries_do_not_scan_growing_tables(audited_client, test_user):
+    with captured_statements() as statements:
+        for drive in ENDPOINTS.values():
+            drive(audited_client, test_user)
+        with flask_app.app_context():
+            drain_inbox()
+
+    assert statements
+    scans = full_scans(statements)
+    assert not scans, f"Full table scans: {scans}"
+
+
+def test_session_store_queries_do_not_scan_sessions(audited_client, test_user):
+    store = flask_app.session_interface.store
+    with captured_session_statements() as statements:
+        for drive in ENDPOINTS.values():
+            drive(audited_client, test_user)
+        store.delete_expired()
+
+    assert statements
+    scans = full_session_scans(statements)
+    assert not scans, f"Full table scans: {scans}"
@@ -0,0 +1,101 @@
+import struct
+import time
+from unittest.mock import patch
+
+from cachelib import FileSystemCache
+
+from app import app as flask_app
+from sessions import SqliteSessionStore, migrate_filesystem_sessions
+
+
+def test_store_get_set_delete(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / "sessions.db"))
+    store.set("session:abc", b"data", time.time() + 60)
+    assert store.get("session:abc") == b"data"
+
+    store.delete("session:abc")
+    assert store.get("session:abc") is None
+
+
+def test_expired_sessions_are_hidden_then_purged_in_batches(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / "sessions.db"))
+    now = time.time()
+    for i in range(5):
+        store.set(f"session:old{i}", b"x", now - 1)
+    store.set("session:live", b"y", now + 60)
+
+    assert store.get("session:old0") is None
+    assert store.delete_expired(batch_size=2) == 5
+    assert store.get("session:live") == b"y"
+
+
+def test_filesystem_sessions_are_migrated(tmp_path):
+    session_dir = tmp_path / "flask_session"
+    cache = FileSystemCache(str(session_dir))
+    cache.set("session:live", {"user_id": 7, "cart": {}}, timeout=600)
+    cache.set("session:gone", {"user_id": 8}, timeout=600)
+    # Backdate one file's expiry to simulate an expired session.
+    gone = session_dir / cache._get_filename("session:gone").split("/")[-1]
+    gone.write_bytes(struct.pack("I", 1) + gone.read_bytes()[4:])
+
+    store = SqliteSessionStore(str(tmp_path / "sessions.db"))
+    serializer = flask_app.session_interface.serializer
+    migrated, skipped = migrate_filesystem_sessions(str(session_dir), store, serializer)
+
+    assert (migrated, skipped) == (1, 1)
+    assert serializer.decode(store.get("session:live")) == {"user_id": 7, "cart": {}}
+
+
+def _count_writes(monkeypatch):
+    writes = []
+    store = flask_app.session_interface.store
+    original = store.set
+    monkeypatch.setattr(
+        store, "set", lambda *args: writes.append(args[0]) or original(*args)
+    )
+    return writes
+
+
+def test_unchanged_session_is_not_rewritten(client, logged_in_user, monkeypatch):
+    client.get("/dashboard")  # settles the cart and user_id keys
+    writes = _count_writes(monkeypatch)
+
+    client.get("/dashboard")
+    client.get("/dashboard")
+
+    assert writes == []
+
+
+def test_cart_change_writes_session_once(client, logged_in_user, monkeypatch):
+    client.get("/dashboard")
+    writes = _count_writes(monkeypatch)
+
+    with patch("cutoffs.CutoffSchedule.is_closed", return_value=False):
+        client.post("/add_to_cart", data={"meal_2025-04-28": "Test Meal"})
+
+    assert len(writes) == 1
+
+
+def test_expiry_is_refreshed_after_interval(client, logged_in_user, monkeypatch):
+    client.get("/dashboard")
+    writes = _count_writes(monkeypatch)
+
+    monkeypatch.setattr(flask_app.session_interface, "refresh_interval", 0)
+    response = client.get("/dashboard")
+
+    assert len(writes) == 1
+    assert "session=" in response.headers.get("Set-Cookie", "")
+
+
+def test_opted_out_routes_skip_the_session(client, logged_in_user, monkeypatch):
+    loads = []
+    store = flask_app.session_interface.store
+    original = store.load
+    monkeypatch.setattr(
+        store, "load", lambda *args: loads.append(args) or original(*args)
+    )
+
+    client.get("/js/cart.js")
+    client.get("/static/favicon.ico")
+
+    assert loads == []
@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import stripe
+
+from stripe_client import StripeAPI
+
+
+class FlakyStripe:
+    """HTTP server answering PaymentIntent calls after `failures` 500s"""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.requests = []  # (idempotency key, client port)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._reply()
+
+            def do_GET(self):
+                self._reply()
+
+            def _reply(self):
+                stub.requests.append(
+                    (self.headers.get("Idempotency-Key"), self.client_address[1])
+                )
+                time.sleep(stub.delay)
+                status, body = 200, {"id": "pi_1", "object": "payment_intent"}
+                if stub.failures:
+                    stub.failures -= 1
+                    status, body = 500, {"error": {"type": "api_error"}}
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def flaky():
+    servers = []
+
+    def start(**kwargs):
+        server = FlakyStripe(**kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def _api(monkeypatch, server, **kwargs):
+    monkeypatch.setattr(stripe, "api_key", "sk_test")
+    monkeypatch.setattr(stripe, "api_base", server.url)
+    return StripeAPI(**kwargs)
+
+
+def test_calls_reuse_one_connection(flaky, monkeypatch):
+    server = flaky()
+    api = _api(monkeypatch, server)
+    api.create_payment_intent(amount=100, currency="usd")
+    api.retrieve_payment_intent("pi_1")
+    api.retrieve_payment_intent("pi_1")
+
+    assert len({port for _, port in server.requests}) == 1
+
+
+def test_post_retries_reuse_the_idempotency_key(flaky, monkeypatch):
+    server = flaky(failures=2)
+    api = _api(monkeypatch, server, max_retries=2)
+    intent = api.create_payment_intent(amount=100, currency="usd")
+
+    assert intent.id == "pi_1"
+    keys = [key for key, _ in server.requests]
+    assert len(keys) == 3
+    assert keys[0] and len(set(keys)) == 1
+
+
+def test_retries_are_bounded(flaky, monkeypatch):
+    server = flaky(failures=10)
+    api = _api(monkeypatch, server, max_retries=1)
+    with pytest.raises(stripe.APIError):
+        api.retrieve_payment_intent("pi_1")
+
+    assert len(server.requests) == 2
+
+
+def test_slow_responses_time_out(flaky, monkeypatch):
+    server = flaky(delay=1)
+    api = _api(
+        monkeypatch,
+        server,
+        max_retries=0,
+        timeouts={"payment_intent.retrieve": (1, 0.1)},
+    )
+    started = time.monotonic()
+    with pytest.raises(stripe.APIConnectionError):
+        api.retrieve_payment_intent("pi_1")
+
+    assert time.monotonic() - started < 0.9
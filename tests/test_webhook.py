@@ -1,9 +1,15 @@
 import json
+from datetime import date
+from unittest.mock import MagicMock, patch
+
 import pytest
-from unittest.mock import patch
 from app import app as flask_app, db, User, Order
+from models import WebhookEvent
+from webhooks import HANDLERS, drain_inbox
 from werkzeug.security import generate_password_hash
 
+from tests.conftest import login
+
 
 @pytest.fixture
 def app_ctx():
@@ -29,15 +35,20 @@ def _make_event(user_id, cart, payment_intent_id="pi_test_webhook_123"):
     }
 
 
-def _post_webhook(client, event_dict):
+def _post_webhook(client, event_dict, drain=True):
+    """Post an event and, by default, drain the inbox as the worker would."""
     payload = json.dumps(event_dict).encode()
     with patch("app.stripe.Webhook.construct_event", return_value=event_dict):
-        return client.post(
+        response = client.post(
             "/webhook",
             data=payload,
             content_type="application/json",
             headers={"Stripe-Signature": "t=1,v1=test"},
         )
+    if drain:
+        with flask_app.app_context():
+            drain_inbox()
+    return response
 
 
 def _create_user(app_ctx, username="webhook@example.com"):
@@ -119,3 +130,93 @@ def test_webhook_rejects_invalid_signature(client, app_ctx):
             headers={"Stripe-Signature": "invalid"},
         )
     assert response.status_code == 400
+
+
+def test_webhook_acknowledges_before_creating_orders(client, app_ctx):
+    user_id = _create_user(app_ctx, username="inbox@example.com")
+    event = _make_event(user_id, {"2026-05-19": "Test Meal"}, "pi_inbox_1")
+
+    response = _post_webhook(client, event, drain=False)
+
+    assert response.status_code == 200
+    with app_ctx.app_context():
+        assert Order.query.filter_by(payment_intent_id="pi_inbox_1").count() == 0
+        assert WebhookEvent.query.filter_by(status="pending").count() == 1
+
+        drain_inbox()
+        assert Order.query.filter_by(payment_intent_id="pi_inbox_1").count() == 1
+        assert WebhookEvent.query.one().status == "done"
+
+
+def test_webhook_ignores_unhandled_event_types(client, app_ctx):
+    event = {"id": "evt_other", "type": "charge.refunded", "data": {"object": {}}}
+
+    response = _post_webhook(client, event, drain=False)
+
+    assert response.status_code == 200
+    with app_ctx.app_context():
+        assert WebhookEvent.query.count() == 0
+
+
+def test_failing_event_is_retried_then_dead_lettered(client, app_ctx):
+    user_id = _create_user(app_ctx, username="retry@example.com")
+    event = _make_event(user_id, {"2026-05-19": "Test Meal"}, "pi_retry")
+    _post_webhook(client, event, drain=False)
+
+    def failing_handler(event):
+        raise RuntimeError("database is locked")
+
+    with app_ctx.app_context(), patch.dict(
+        HANDLERS, {"payment_intent.succeeded": failing_handler}
+    ), patch("webhooks.retry_delay", return_value=0):
+        drain_inbox(max_attempts=2)
+        assert WebhookEvent.query.one().status == "pending"
+        drain_inbox(max_attempts=2)
+        inbox_event = WebhookEvent.query.one()
+        assert inbox_event.status == "dead"
+        assert inbox_event.attempts == 2
+        assert "database is locked" in inbox_event.last_error
+
+
+def _intent(event):
+    intent = MagicMock()
+    payment = event["data"]["object"]
+    intent.id = payment["id"]
+    intent.status = "succeeded"
+    intent.amount = 2500
+    intent.currency = "usd"
+    intent.metadata = payment["metadata"]
+    return intent
+
+
+def test_webhook_after_confirmation_saved_the_orders(client, app_ctx):
+    user_id = _create_user(app_ctx, username="race@example.com")
+    cart = {"2026-05-19": "Test Meal", "2026-05-20": "Test Meal"}
+    event = _make_event(user_id, cart, "pi_race")
+    login(client, "race@example.com", "pw")
+    _post_webhook(client, event, drain=False)
+
+    # The customer's redirect reaches /confirmation before the inbox drains
+    with patch("app.stripe_api.retrieve_payment_intent", return_value=_intent(event)):
+        client.get("/confirmation?payment_intent=pi_race")
+    with app_ctx.app_context():
+        drain_inbox()
+
+        assert WebhookEvent.query.one().status == "done"
+        assert Order.query.filter_by(payment_intent_id="pi_race").count() == 2
+
+
+def test_webhook_keeps_orders_already_saved_for_a_date(client, app_ctx):
+    user_id = _create_user(app_ctx, username="conflict@example.com")
+    with app_ctx.app_context():
+        db.session.add(Order(user_id=user_id, date=date(2026, 5, 19), meal_name="Soup"))
+        db.session.commit()
+    cart = {"2026-05-19": "Test Meal", "2026-05-20": "Test Meal"}
+
+    _post_webhook(client, _make_event(user_id, cart, "pi_conflict"))
+
+    with app_ctx.app_context():
+        inbox_event = WebhookEvent.query.one()
+        assert (inbox_event.status, inbox_event.attempts) == ("done", 1)
+        orders = {o.date.isoformat(): o.meal_name for o in Order.query.all()}
+        assert orders == {"2026-05-19": "Soup", "2026-05-20": "Test Meal"}
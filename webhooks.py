@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from metrics import observe_webhook
+from models import db, WebhookEvent
+from orders import save_paid_orders
+from payments import record_intent
+
+logger = logging.getLogger(__name__)
+
+# Event type -> handler(event dict).  Only these types are stored in the inbox.
+HANDLERS = {}
+
+# Seconds a claimed event stays hidden from other workers before it is retried
+CLAIM_LEASE = 300
+
+
+def handles(event_type):
+    """Register a function as the handler for a Stripe event type"""
+
+    def register(func):
+        HANDLERS[event_type] = func
+        return func
+
+    return register
+
+
+def enqueue_event(event_id, event_type, payload):
+    """Store a verified event in the inbox.
+
+    Returns False if the event is not handled or was already received.
+    """
+    if event_type not in HANDLERS:
+        return False
+    if not event_id:
+        event_id = "sha256:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    now = time.time()
+    result = db.session.execute(
+        insert(WebhookEvent.__table__)
+        .values(
+            event_id=event_id,
+            type=event_type,
+            payload=payload,
+            status="pending",
+            attempts=0,
+            received_at=now,
+            next_attempt_at=now,
+        )
+        .on_conflict_do_nothing(index_elements=["event_id"])
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def retry_delay(attempts):
+    """Exponential backoff between attempts: 10s, 20s, 40s ... capped at 15 min"""
+    return min(10 * 2 ** (attempts - 1), 900)
+
+
+def claim_events(batch_size, now=None):
+    """Atomically mark up to batch_size due events as processing and return them"""
+    if now is None:
+        now = time.time()
+    table = WebhookEvent.__table__
+    due = (
+        select(table.c.id)
+        .where(
+            table.c.status.in_(("pending", "processing")),
+            table.c.next_attempt_at <= now,
+        )
+        .order_by(table.c.id)
+        .limit(batch_size)
+    )
+    claimed = db.session.execute(
+        update(table)
+        .where(table.c.id.in_(due.scalar_subquery()))
+        .values(
+            status="processing",
+            attempts=table.c.attempts + 1,
+            next_attempt_at=now + CLAIM_LEASE,
+        )
+        .returning(
+            table.c.id,
+            table.c.type,
+            table.c.payload,
+            table.c.attempts,
+            table.c.received_at,
+        )
+    ).all()
+    db.session.commit()
+    return sorted(claimed, key=lambda row: row.id)
+
+
+def drain_inbox(batch_size=50, max_attempts=5):
+    """Process one batch of due inbox events.  Returns the number claimed.
+
+    A handler that raises leaves the event pending with a backoff delay; after
+    max_attempts failures it is parked as dead for someone to look at.
+    """
+    claimed = claim_events(batch_size)
+    for row in claimed:
+        try:
+            HANDLERS[row.type](json.loads(row.payload))
+            db.session.commit()
+            values = {"status": "done", "processed_at": time.time(), "last_error": None}
+        except Exception as e:
+            db.session.rollback()
+            if row.attempts >= max_attempts:
+                logger.error(
+                    f"Webhook event {row.id} is dead after {row.attempts} attempts: {e}"
+                )
+                values = {"status": "dead", "last_error": str(e)}
+            else:
+                logger.warning(
+                    f"Webhook event {row.id} failed (attempt {row.attempts}): {e}"
+                )
+                values = {
+                    "status": "pending",
+                    "last_error": str(e),
+                    "next_attempt_at": time.time() + retry_delay(row.attempts),
+                }
+        db.session.execute(
+            update(WebhookEvent.__table__)
+            .where(WebhookEvent.__table__.c.id == row.id)
+            .values(**values)
+        )
+        db.session.commit()
+        observe_webhook(row.type, values["status"], row.received_at)
+    return len(claimed)
+
+
+@handles("payment_intent.succeeded")
+def handle_payment_intent_succeeded(event):
+    intent = event["data"]["object"]
+    payment_intent_id = intent["id"]
+    metadata = intent.get("metadata") or {}
+    user_id = metadata.get("user_id")
+    cart_json = metadata.get("cart") or "{}"
+
+    if not user_id or not cart_json:
+        logger.warning(f"Webhook: missing metadata on {payment_intent_id}")
+        return
+
+    try:
+        user_id_int = int(user_id)
+    except (ValueError, TypeError):
+        logger.error(f"Webhook: invalid user_id '{user_id}' on {payment_intent_id}")
+        return
+
+    try:
+        cart = json.loads(cart_json)
+    except (ValueError, json.JSONDecodeError):
+        logger.error(f"Webhook: invalid cart JSON on {payment_intent_id}")
+        return
+
+    record_intent(
+        payment_intent_id,
+        intent.get("status", "succeeded"),
+        intent.get("amount", 0),
+        intent.get("currency", "usd"),
+        metadata,
+    )
+
+    # The confirmation page may have saved some or all of them already
+    inserted = save_paid_orders(user_id_int, cart, payment_intent_id)
+    logger.info(
+        f"Webhook: saved {len(inserted)} of {len(cart)} order(s) "
+        f"for payment {payment_intent_id}"
+    )
+
+
+class InboxWorker(threading.Thread):
+    """Daemon thread that drains the inbox when notified or every poll_interval"""
+
+    def __init__(self, app):
+        super().__init__(name="webhook-inbox", daemon=True)
+        self.app = app
+        self.wake = threading.Event()
+
+    def run(self):
+        config = self.app.config
+        while True:
+            self.wake.wait(config["WEBHOOK_POLL_INTERVAL"])
+            self.wake.clear()
+            try:
+                with self.app.app_context():
+                    batch_size = config["WEBHOOK_BATCH_SIZE"]
+                    while (
+                        drain_inbox(batch_size, config["WEBHOOK_MAX_ATTEMPTS"])
+                        == batch_size
+                    ):
+                        pass
+            except Exception as e:
+                logger.error(f"Webhook inbox worker error: {e}", exc_info=True)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_worker(app):
+    """Start this process's inbox worker once; returns it, or None if disabled"""
+    global _worker
+    if not app.config["WEBHOOK_WORKER_ENABLED"]:
+        return None
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = InboxWorker(app)
+            _worker.start()
+            # Pick up anything left over from before a restart
+            _worker.wake.set()
+        return _worker
+
+
+def notify_worker(app):
+    worker = start_worker(app)
+    if worker is not None:
+        worker.wake.set()